@@ -0,0 +1 @@
+# Benchmarks and verification scripts, run as python -m benchmarks.<name>
@@ -0,0 +1,106 @@
+"""
+Compares embedder backends against the torch reference on sample collections:
+score error, rank correlation, top-5 section agreement and throughput.
+
+Usage: python -m benchmarks.backend_parity [--backends onnx onnx-int8] [--json out.json] [COLLECTION_DIR ...]
+Collection directories default to every Collection* directory in the project root.
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+import numpy as np
+
+from core import embedder
+from core.generate_output import rank_sections
+from core.schemas import CorpusBuilder
+from core.sectioner_pymupdf import extract_sections_from_pdf
+from core.sentences import add_sections
+
+
+def load_collection(collection_dir):
+    """Returns (corpus, query) for a collection directory."""
+    with open(os.path.join(collection_dir, "challenge1b_input.json")) as f:
+        input_data = json.load(f)
+    builder = CorpusBuilder()
+    for doc in input_data["documents"]:
+        add_sections(builder, extract_sections_from_pdf(os.path.join(collection_dir, "PDFs", doc["filename"])))
+    query = input_data["persona"]["role"] + " " + input_data["job_to_be_done"]["task"]
+    return builder.build(), query
+
+
+def _ranks(values):
+    ranks = np.empty(len(values))
+    ranks[np.argsort(values, kind="stable")] = np.arange(len(values))
+    return ranks
+
+
+def spearman(a, b):
+    if len(a) < 2:
+        return 1.0
+    return float(np.corrcoef(_ranks(a), _ranks(b))[0, 1])
+
+
+def score_with(backend, corpus, query):
+    sentences = corpus.sentence_texts()
+    # Warm up so model loading is not counted as inference time
+    embedder.embed_sentences(sentences[:8], use_cache=False, backend=backend)
+    start = time.perf_counter()
+    embeddings = embedder.embed_sentences(sentences, use_cache=False, backend=backend)
+    elapsed = time.perf_counter() - start
+    query_emb = embedder.embed_sentences([query], use_cache=False, backend=backend)[0]
+    corpus.scores = (embeddings @ query_emb).astype(np.float32)
+    extracted, _ = rank_sections(corpus)
+    top_sections = [(section.document, section.section_title, section.page_number) for section in extracted]
+    return corpus.scores.copy(), top_sections, len(sentences) / elapsed if elapsed else float("inf")
+
+
+def compare(collection_dir, backends):
+    corpus, query = load_collection(collection_dir)
+    ref_scores, ref_top, ref_rate = score_with("torch", corpus, query)
+    report = {"collection": os.path.basename(collection_dir), "sentences": corpus.num_sentences,
+              "backends": {"torch": {"sentences_per_sec": ref_rate}}}
+    for backend in backends:
+        scores, top, rate = score_with(backend, corpus, query)
+        error = np.abs(scores.astype(np.float64) - ref_scores)
+        report["backends"][backend] = {
+            "sentences_per_sec": rate,
+            "speedup": rate / ref_rate,
+            "max_abs_score_diff": float(error.max()) if len(error) else 0.0,
+            "mean_abs_score_diff": float(error.mean()) if len(error) else 0.0,
+            "spearman": spearman(scores, ref_scores),
+            "top5_same_order": top == ref_top,
+            "top5_overlap": len(set(top) & set(ref_top)),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("collections", nargs="*")
+    parser.add_argument("--backends", nargs="+", default=["onnx", "onnx-int8"])
+    parser.add_argument("--json", help="Write the full report to this file")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    collections = args.collections or sorted(glob.glob(os.path.join(root, "Collection*")))
+    reports = [compare(collection, args.backends) for collection in collections]
+
+    for report in reports:
+        print(f"{report['collection']} ({report['sentences']} sentences)")
+        print(f"  torch      {report['backends']['torch']['sentences_per_sec']:10.1f} sentences/s (reference)")
+        for backend in args.backends:
+            r = report["backends"][backend]
+            print(f"  {backend:10s} {r['sentences_per_sec']:10.1f} sentences/s  x{r['speedup']:.2f}  "
+                  f"max|d|={r['max_abs_score_diff']:.2e} mean|d|={r['mean_abs_score_diff']:.2e}  "
+                  f"spearman={r['spearman']:.4f}  top5 overlap={r['top5_overlap']}/5"
+                  f"{' (same order)' if r['top5_same_order'] else ''}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
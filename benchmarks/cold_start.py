@@ -0,0 +1,60 @@
+"""
+Measures embedder cold start, from a fresh interpreter to the first embedding,
+loading the TorchScript artifact against the Hugging Face path through transformers.
+
+Usage: python -m benchmarks.cold_start [--runs N]
+The artifact is written by download_model.py (EXPORT_TORCHSCRIPT, on by default).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from core.embedder import torchscript_artifact, TORCHSCRIPT_DIR
+
+_PROBE = """
+import json, time
+start = time.perf_counter()
+from core import metrics
+from core.embedder import get_embedding
+get_embedding("Travel Planner plan a trip of 4 days for a group of 10 college friends.")
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "model_load": metrics.snapshot()["timers"]["model_load"]["seconds"]}))
+"""
+
+
+def measure(env_overrides, runs):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, **env_overrides)
+    totals, loads = [], []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", _PROBE], cwd=root, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        totals.append(result["seconds"])
+        loads.append(result["model_load"])
+    return statistics.median(totals), statistics.median(loads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    modes = {"huggingface": {"EMBEDDER_TORCHSCRIPT": "0"}}
+    if torchscript_artifact() is not None:
+        modes["torchscript"] = {"EMBEDDER_TORCHSCRIPT": "1"}
+    else:
+        print(f"No TorchScript artifact in {TORCHSCRIPT_DIR}; run download_model.py to create it")
+
+    results = {name: measure(env, args.runs) for name, env in modes.items()}
+    for name, (total, load) in results.items():
+        print(f"{name:12s} first embedding {total * 1000:8.1f} ms  (model load {load * 1000:8.1f} ms)")
+    if len(results) == 2:
+        print(f"Cold start speedup: x{results['huggingface'][0] / results['torchscript'][0]:.2f}")
+
+
+if __name__ == "__main__":
+    main()
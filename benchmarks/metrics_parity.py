@@ -0,0 +1,69 @@
+"""
+Checks that the sequential and the multiprocess collection runners write the
+same metrics counters, so per-worker metrics are merged, not lost or doubled.
+
+Usage: python -m benchmarks.metrics_parity [--root DIR] [--processes N]
+Collections are copied to temporary directories; the originals are untouched.
+Exits non-zero if any collection's counters differ.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from core.process_collections_mp import get_collection_dirs
+
+_RUN = "import sys; from core.{module} import main; main(sys.argv[1])"
+
+# Settings that would make the two runs do different work
+_UNSET = ("PIPELINE_CACHE_DIR", "PIPELINE_INCREMENTAL", "PIPELINE_STREAMING", "PIPELINE_PAGE_SHARDS")
+
+
+def run(module, source_root, collections, env_overrides):
+    """Runs one entry point on a copy of the collections and returns each one's sidecar counters."""
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {name: value for name, value in os.environ.items() if name not in _UNSET}
+    env.update(env_overrides)
+    with tempfile.TemporaryDirectory() as root:
+        for collection in collections:
+            shutil.copytree(os.path.join(source_root, collection), os.path.join(root, collection),
+                            ignore=shutil.ignore_patterns("challenge1b_output.json", "challenge1b_metrics.json",
+                                                          "challenge1b_manifest.json", ".scored"))
+        subprocess.run([sys.executable, "-c", _RUN.format(module=module), root], cwd=project_root, env=env,
+                       check=True, stdout=subprocess.DEVNULL)
+        counters = {}
+        for collection in collections:
+            with open(os.path.join(root, collection, "challenge1b_metrics.json")) as f:
+                counters[collection] = json.load(f)["counters"]
+        return counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--root", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser.add_argument("--processes", type=int, default=2)
+    args = parser.parse_args()
+
+    collections = get_collection_dirs(args.root)
+    if not collections:
+        sys.exit(f"No collections found in {args.root}")
+    serial = run("process_collections", args.root, collections, {})
+    parallel = run("process_collections_mp", args.root, collections, {"PIPELINE_PROCESSES": str(args.processes)})
+
+    failed = False
+    for collection in collections:
+        names = sorted(set(serial[collection]) | set(parallel[collection]))
+        diffs = [(name, serial[collection].get(name), parallel[collection].get(name))
+                 for name in names if serial[collection].get(name) != parallel[collection].get(name)]
+        failed = failed or bool(diffs)
+        print(f"{collection}: {'ok' if not diffs else 'MISMATCH'}")
+        for name, expected, actual in diffs:
+            print(f"  {name}: sequential {expected}, multiprocess {actual}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Microbenchmark for the single-pass text normalizer in core.sectioner_pymupdf
+against the regex cascade it replaced, kept here as the reference, reported
+in lines per second. core/test_sectioner_pymupdf.py checks that both produce
+identical output.
+
+Usage: python -m benchmarks.normalizer [--repeat N] [COLLECTION_DIR ...]
+Collection directories default to every Collection* directory in the project root.
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+from core import sectioner_pymupdf
+from core.sectioner_pymupdf import clean_text, post_process_section_content, should_include_line
+
+
+def legacy_clean_text(text):
+    """clean_text as it was before the single-pass normalizer: one re.sub per rule."""
+    if not text:
+        return ""
+    
+    # First, handle Unicode ligatures and special combinations
+    text = re.sub(r'\ufb00', 'ff', text)  # ff ligature
+    text = re.sub(r'\ufb01', 'fi', text)  # fi ligature
+    text = re.sub(r'\ufb02', 'fl', text)  # fl ligature
+    text = re.sub(r'\ufb03', 'ffi', text)  # ffi ligature
+    text = re.sub(r'\ufb04', 'ffl', text)  # ffl ligature
+    text = re.sub(r'\ufb05', 'ft', text)   # ft ligature
+    text = re.sub(r'\ufb06', 'st', text)   # st ligature
+    
+    # Handle Unicode escape sequences that should be converted to proper characters
+    # Common smart quotes and apostrophes
+    text = re.sub(r'[\u2018\u2019]', "'", text)  # Smart single quotes to regular apostrophe
+    text = re.sub(r'[\u201C\u201D]', '"', text)  # Smart double quotes to regular quotes
+    text = re.sub(r'[\u2013\u2014]', '-', text)  # En dash and em dash to regular dash
+    text = re.sub(r'[\u2026]', '...', text)  # Ellipsis to three dots
+    
+    # Remove common Unicode bullet points and special characters
+    text = re.sub(r'[\u2022\u2023\u25E6\u2043\u2219]', '', text)  # Various bullet points
+    text = re.sub(r'[\u200B\u200C\u200D\uFEFF]', '', text)  # Zero-width characters
+    text = re.sub(r'[\u00A0]', ' ', text)  # Non-breaking space to regular space
+    
+    # Remove other problematic Unicode characters that might appear as \u sequences
+    text = re.sub(r'[\u0000-\u001F\u007F-\u009F]', '', text)  # Control characters
+    
+    # Handle any remaining Unicode escape sequences that might be literal \u codes in the text
+    # This catches cases where the text contains literal "\u2022" strings instead of the actual character
+    text = re.sub(r'\\u[0-9a-fA-F]{4}', '', text)
+    
+    # Clean up any "o " patterns that might be leftover bullet formatting
+    text = re.sub(r'\bo\s+', '', text)  # Remove standalone "o " (often from bullet points)
+    
+    # Handle common OCR/PDF extraction errors
+    text = re.sub(r'o\ufb04ine', 'offline', text)  # Specific fix for "offline"
+    text = re.sub(r'o\ufb03ce', 'office', text)    # Specific fix for "office"
+    
+    # Normalize whitespace
+    text = re.sub(r'\s+', ' ', text)
+    text = text.strip()
+    
+    return text
+
+
+def legacy_post_process_section_content(content):
+    """post_process_section_content as it was before the single-pass normalizer."""
+    if not content:
+        return ""
+    
+    # Split into lines for processing
+    lines = content.split('\n')
+    processed_lines = []
+    
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+            
+        # Additional cleaning for common patterns
+        # Remove standalone "o" at the beginning of lines (bullet artifacts)
+        line = re.sub(r'^o\s+', '', line)
+        
+        # Clean up any remaining escape sequences
+        line = legacy_clean_text(line)
+        
+        # Additional specific fixes for common OCR errors
+        line = re.sub(r'\boffi\s*ce\b', 'office', line)  # office split across ligatures
+        line = re.sub(r'\boff\s*line\b', 'offline', line)  # offline split
+        
+        # Fix common word boundary issues
+        line = re.sub(r'\s+', ' ', line)  # Multiple spaces to single space
+        
+        # Only keep lines that have meaningful content
+        if should_include_line(line):
+            processed_lines.append(line)
+    
+    # Final pass to clean up the entire content
+    result = '\n'.join(processed_lines).strip()
+    
+    # Apply final cleaning to the entire content
+    result = legacy_clean_text(result)
+    
+    return result
+
+
+def raw_lines(pdf_path):
+    """Uncleaned (text, font_names, font_size, page) lines, as extract_lines_with_fonts sees them."""
+    import fitz
+    lines = []
+    with fitz.open(pdf_path) as doc:
+        for page_num, page in enumerate(doc):
+            for b in page.get_text("dict")["blocks"]:
+                if b["type"] == 0:
+                    for l in b["lines"]:
+                        lines.append({
+                            "text": " ".join(span["text"] for span in l["spans"]).strip(),
+                            "font_names": list(set(span["font"] for span in l["spans"])),
+                            "font_size": max(span["size"] for span in l["spans"]),
+                            "page": page_num,
+                        })
+    return lines
+
+
+def _sections(lines, clean, finalize, heading):
+    """The cleaning half of parse_sections_from_pdf, as (title, content, page) tuples."""
+    sections = []
+    title, page, content = None, 0, []
+
+    def close():
+        if title:
+            filtered = [text for text in content if should_include_line(text)]
+            if filtered:
+                text = finalize(filtered)
+                if text:
+                    sections.append((title, text, page))
+
+    for line in lines:
+        text = clean(line["text"])
+        if not text:
+            continue
+        cleaned = dict(line, text=text)
+        if sectioner_pymupdf.is_heading(cleaned):
+            if title:
+                close()
+                content = []
+            # Lines before the first heading stay in the first section's content
+            title, page = heading(text), line["page"]
+        elif should_include_line(text):
+            content.append(text)
+    close()
+    return sections
+
+
+def legacy_sections(lines):
+    return _sections(lines, legacy_clean_text,
+                     lambda content: legacy_post_process_section_content("\n".join(content)),
+                     lambda text: legacy_clean_text(text.strip()))
+
+
+def new_sections(lines):
+    return _sections(lines, clean_text, sectioner_pymupdf._finalize_section, sectioner_pymupdf._renormalize)
+
+
+def time_lines_per_sec(lines_by_doc, build, repeat):
+    total = sum(len(lines) for lines in lines_by_doc.values())
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for lines in lines_by_doc.values():
+            build(lines)
+        best = min(best, time.perf_counter() - start)
+    return total / best if best else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("collections", nargs="*")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing runs; the best is reported")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    collections = args.collections or sorted(glob.glob(os.path.join(root, "Collection*")))
+    pdfs = [pdf for collection in collections for pdf in sorted(glob.glob(os.path.join(collection, "PDFs", "*.pdf")))]
+    lines_by_doc = {pdf: raw_lines(pdf) for pdf in pdfs}
+    print(f"{len(pdfs)} PDFs, {sum(len(lines) for lines in lines_by_doc.values())} lines")
+
+    if not lines_by_doc:
+        sys.exit("No PDFs to time; pass collection directories")
+    before = time_lines_per_sec(lines_by_doc, legacy_sections, args.repeat)
+    after = time_lines_per_sec(lines_by_doc, new_sections, args.repeat)
+    print(f"Regex cascade:       {before:12.0f} lines/s")
+    print(f"Single-pass engine:  {after:12.0f} lines/s  x{after / before:.2f}")
+
+
+if __name__ == "__main__":
+    main()
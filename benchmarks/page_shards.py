@@ -0,0 +1,44 @@
+"""
+Times page-sharded extraction of one PDF against a serial run for increasing
+worker counts, and checks that the sharded sections are identical.
+
+Usage: python -m benchmarks.page_shards [--workers 1 2 4] [--repeat N] PDF
+"""
+import argparse
+import time
+
+from core.resources import available_cpus
+from core.sectioner_pymupdf import parse_sections_from_pdf
+
+
+def _timed(pdf_path, workers, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sections = parse_sections_from_pdf(pdf_path, workers=workers)
+        best = min(best, time.perf_counter() - start)
+    return [(s.section_title, s.section_content, s.page_number) for s in sections], best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pdf")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        help="Worker counts to time (default: powers of two up to the available cores)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing runs; the best is reported")
+    args = parser.parse_args()
+
+    cpus = available_cpus()
+    workers = args.workers or sorted({2 ** i for i in range(cpus.bit_length())} | {cpus})
+    reference, serial = _timed(args.pdf, 1, args.repeat)
+    print(f"{len(reference)} sections, serial {serial:.3f}s ({cpus} CPUs available)")
+    for count in workers:
+        if count == 1:
+            continue
+        sections, elapsed = _timed(args.pdf, count, args.repeat)
+        print(f"  {count:3d} workers {elapsed:8.3f}s  x{serial / elapsed:.2f}  "
+              f"{'identical' if sections == reference else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Recall of the BM25 lexical prefilter: compares the final top-5 sections for
+several candidate counts N against the exhaustive mode on sample collections.
+With --hierarchical-k, hierarchical scoring (top K sections by section
+embedding) is reported the same way, with its forward passes.
+
+Usage: python -m benchmarks.prefilter_recall [--top-n 10 20 50 100] [--hierarchical-k 10 20] [--json out.json] [COLLECTION_DIR ...]
+Collection directories default to every Collection* directory in the project root.
+Sentences are embedded once; each prefiltered run ranks its candidate subset of
+those scores, which is what scoring only the candidates would produce.
+"""
+import argparse
+import glob
+import json
+import os
+
+from benchmarks.backend_parity import load_collection
+import numpy as np
+
+from core.embedder import embed_sentences, get_embedding, score_corpus
+from core.generate_output import rank_sections, top_k_indices
+from core.hierarchical import section_summaries
+from core.lexical import lexical_candidates
+
+
+def _top(corpus):
+    extracted, _ = rank_sections(corpus)
+    return [(section.document, section.section_title, section.page_number) for section in extracted]
+
+
+def _compare(corpus, candidates, reference, extra_passes=0):
+    top = _top(candidates)
+    passes = candidates.num_sentences + extra_passes
+    return {
+        "recall_at_5": len(set(top) & set(reference)) / len(reference) if reference else 1.0,
+        "same_order": top == reference,
+        "sentences_embedded": passes,
+        "embedded_fraction": passes / corpus.num_sentences if corpus.num_sentences else 1.0,
+    }
+
+
+def recall_report(collection_dir, top_ns, hierarchical_ks=()):
+    corpus, query = load_collection(collection_dir)
+    query_emb = get_embedding(query)
+    score_corpus(corpus, query_emb)
+    reference = _top(corpus)
+    report = {"collection": os.path.basename(collection_dir), "sections": corpus.num_sections,
+              "sentences": corpus.num_sentences, "top_n": {}, "hierarchical_k": {}}
+    for top_n in top_ns:
+        candidates = corpus.select_sections(lexical_candidates(corpus, query, top_n))
+        report["top_n"][top_n] = _compare(corpus, candidates, reference)
+    if hierarchical_ks:
+        section_scores = embed_sentences(section_summaries(corpus)) @ query_emb
+        for top_k in hierarchical_ks:
+            candidates = corpus.select_sections(np.sort(top_k_indices(section_scores, top_k)))
+            report["hierarchical_k"][top_k] = _compare(corpus, candidates, reference, corpus.num_sections)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("collections", nargs="*")
+    parser.add_argument("--top-n", type=int, nargs="+", default=[10, 20, 50, 100])
+    parser.add_argument("--hierarchical-k", type=int, nargs="*", default=[])
+    parser.add_argument("--json", help="Write the full report to this file")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    collections = args.collections or sorted(glob.glob(os.path.join(root, "Collection*")))
+    reports = [recall_report(collection, args.top_n, args.hierarchical_k) for collection in collections]
+
+    for report in reports:
+        print(f"{report['collection']} ({report['sections']} sections, {report['sentences']} sentences)")
+        rows = [(f"N={n}", r) for n, r in report["top_n"].items()]
+        rows += [(f"K={k}", r) for k, r in report["hierarchical_k"].items()]
+        for label, r in rows:
+            print(f"  {label:<7s} recall@5={r['recall_at_5']:.2f}{' (same order)' if r['same_order'] else '':14s} "
+                  f"{r['sentences_embedded']} forward passes ({r['embedded_fraction']:.0%})")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
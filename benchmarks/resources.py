@@ -0,0 +1,64 @@
+"""
+Benchmarks process_collections_mp with the auto-tuned resource plan against the
+previous fixed entry point (a pool of one process per collection up to
+cpu_count, library default threads in every process, no resource planner).
+
+Usage: python -m benchmarks.resources [--root DIR] [--repeat N]
+Outputs are written into the collections as in a normal run.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from multiprocessing import Pool, cpu_count
+
+from core.process_collections_mp import get_collection_dirs, process_collection_with_logging
+from core.resources import plan_resources
+
+_RUN = "import sys; from core.process_collections_mp import main; main(sys.argv[1])"
+_RUN_FIXED = "import sys; from benchmarks.resources import fixed_main; fixed_main(sys.argv[1])"
+
+
+def fixed_main(root):
+    """The entry point as it was before the resource planner: fixed pool size, no thread limits."""
+    collection_paths = [os.path.join(root, collection) for collection in get_collection_dirs(root)]
+    with Pool(processes=min(len(collection_paths), cpu_count())) as pool:
+        pool.map(process_collection_with_logging, collection_paths)
+
+
+def run(root, script, repeat):
+    env = dict(os.environ)
+    for name in ("PIPELINE_PROCESSES", "PIPELINE_THREADS"):
+        env.pop(name, None)
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", script, root], cwd=project_root, env=env,
+                       check=True, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--root", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    collections = get_collection_dirs(args.root)
+    if not collections:
+        sys.exit(f"No collections found in {args.root}")
+    plan = plan_resources(len(collections))
+    print(plan.describe())
+
+    settings = {"fixed": _RUN_FIXED, "auto": _RUN}
+    results = {name: run(args.root, script, args.repeat) for name, script in settings.items()}
+    for name, seconds in results.items():
+        print(f"{name:6s} {seconds:8.2f} s  {len(collections) / seconds:6.2f} collections/s")
+    print(f"Speedup: x{results['fixed'] / results['auto']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
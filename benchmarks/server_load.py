@@ -0,0 +1,156 @@
+"""
+Load generator for the resident server (core.server): sends concurrent
+/process requests for a collection and reports p50/p99 latency and
+throughput, next to one-shot CLI runs of the same collection.
+
+Usage: python -m benchmarks.server_load [--start-server] [--url URL | --unix-socket PATH] [--requests N] [--concurrency N] [--cli-runs N] [COLLECTION_DIR]
+COLLECTION_DIR defaults to the first Collection* directory in the project root.
+"""
+import argparse
+import glob
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlparse
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# One-shot CLI run of a single collection, as the container does per invocation
+_CLI = ("import sys; from core.process_collections_mp import process_collection; "
+        "process_collection(sys.argv[1])")
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=600):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_socket = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_socket)
+
+
+def _connection(url, unix_socket):
+    if unix_socket:
+        return UnixHTTPConnection(unix_socket)
+    parsed = urlparse(url)
+    return http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=600)
+
+
+def request(url, unix_socket, method, path, body=None):
+    connection = _connection(url, unix_socket)
+    try:
+        connection.request(method, path, body=body, headers={"Content-Type": "application/json"})
+        response = connection.getresponse()
+        data = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"{method} {path}: HTTP {response.status} {data[:200]!r}")
+        return json.loads(data)
+    finally:
+        connection.close()
+
+
+def wait_until_ready(url, unix_socket, timeout=300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            request(url, unix_socket, "GET", "/health")
+            return
+        except (OSError, RuntimeError):
+            time.sleep(0.2)
+    raise TimeoutError("Server did not become ready")
+
+
+def percentiles(latencies):
+    return {"p50": float(np.percentile(latencies, 50)), "p99": float(np.percentile(latencies, 99)),
+            "mean": float(np.mean(latencies))}
+
+
+def load_test(url, unix_socket, collection_dir, num_requests, concurrency):
+    with open(os.path.join(collection_dir, "challenge1b_input.json")) as f:
+        body = f.read()
+    path = "/process?collection=" + quote(os.path.abspath(collection_dir))
+
+    def one(_):
+        start = time.perf_counter()
+        request(url, unix_socket, "POST", path, body)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = list(pool.map(one, range(num_requests)))
+    elapsed = time.perf_counter() - start
+    return dict(percentiles(latencies), requests_per_sec=num_requests / elapsed)
+
+
+def cli_runs(collection_dir, runs):
+    # Copy the collection so the one-shot runs do not overwrite its output
+    latencies = []
+    with tempfile.TemporaryDirectory() as tmp:
+        target = os.path.join(tmp, "Collection")
+        os.makedirs(target)
+        os.symlink(os.path.abspath(os.path.join(collection_dir, "PDFs")), os.path.join(target, "PDFs"))
+        with open(os.path.join(collection_dir, "challenge1b_input.json")) as src, \
+                open(os.path.join(target, "challenge1b_input.json"), "w") as dst:
+            dst.write(src.read())
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", _CLI, target], cwd=PROJECT_ROOT, check=True,
+                           stdout=subprocess.DEVNULL)
+            latencies.append(time.perf_counter() - start)
+    return dict(percentiles(latencies), requests_per_sec=runs / sum(latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("collection", nargs="?")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--unix-socket")
+    parser.add_argument("--start-server", action="store_true", help="Start core.server for the duration of the test")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--cli-runs", type=int, default=3, help="One-shot CLI runs to compare against (0 skips)")
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    collection = args.collection or sorted(glob.glob(os.path.join(PROJECT_ROOT, "Collection*")))[0]
+    server = None
+    if args.start_server:
+        command = [sys.executable, "-m", "core.server"]
+        if args.unix_socket:
+            command += ["--unix-socket", args.unix_socket]
+        else:
+            parsed = urlparse(args.url)
+            command += ["--host", parsed.hostname, "--port", str(parsed.port)]
+        server = subprocess.Popen(command, cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL)
+    try:
+        wait_until_ready(args.url, args.unix_socket)
+        # One warm-up request so first-request effects are not counted
+        load_test(args.url, args.unix_socket, collection, 1, 1)
+        report = {"server": load_test(args.url, args.unix_socket, collection, args.requests, args.concurrency)}
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    if args.cli_runs:
+        report["cli"] = cli_runs(collection, args.cli_runs)
+
+    print(f"{os.path.basename(collection)}: {args.requests} requests, concurrency {args.concurrency}")
+    for name, r in report.items():
+        print(f"  {name:6s} p50 {r['p50'] * 1000:9.1f} ms  p99 {r['p99'] * 1000:9.1f} ms  "
+              f"{r['requests_per_sec']:7.2f} collections/s")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Measures per-worker memory of model workers with and without copy-on-write
+shared weights, as the number of workers grows.
+
+Usage: python -m benchmarks.shared_weights [--workers 1 2 4 8]
+Each worker embeds a batch of sentences (as a collection worker would) and
+reports its /proc smaps_rollup; "private" is what one more worker costs.
+"""
+import argparse
+import os
+import sys
+from multiprocessing import get_context
+
+from core.resources import memory_usage
+
+SENTENCES = [f"Sentence {i} about planning a trip with friends to the coast." for i in range(256)]
+
+
+def _worker(_):
+    from core.embedder import embed_sentences
+    embed_sentences(SENTENCES, use_cache=False)
+    return os.getpid(), memory_usage()
+
+
+def _measure(results, workers, shared):
+    """Runs in a fresh process so the model is loaded (or not) before its pool forks."""
+    if shared:
+        from core.embedder import preload_for_fork
+        preload_for_fork()
+    with get_context("fork").Pool(workers) as pool:
+        # One task per worker; chunksize 1 keeps any one worker from taking several
+        results.put(list(dict(pool.map(_worker, range(workers), chunksize=1)).values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    if memory_usage() is None:
+        sys.exit("/proc/self/smaps_rollup is not available on this system")
+
+    mib = 1024 * 1024
+    print(f"{'mode':8s} {'workers':>7s} {'RSS/worker':>11s} {'private/worker':>15s} {'total PSS':>10s}")
+    ctx = get_context("fork")
+    for shared in (False, True):
+        for workers in args.workers:
+            results = ctx.Queue()
+            runner = ctx.Process(target=_measure, args=(results, workers, shared))
+            runner.start()
+            usage = results.get()
+            runner.join()
+            rss = sum(u["rss"] for u in usage) / len(usage) / mib
+            private = sum(u["private"] for u in usage) / len(usage) / mib
+            pss = sum(u["pss"] for u in usage) / mib
+            print(f"{'shared' if shared else 'private':8s} {workers:7d} {rss:9.0f} MiB {private:13.0f} MiB {pss:6.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Times each pipeline stage separately (extraction, cleaning, sentence splitting,
+embedding and ranking) and reports pages/s, sentences/s and the process peak
+RSS as JSON, optionally flagging regressions against a saved baseline.
+
+Usage: python -m benchmarks.stages [--synthetic-pages N] [--repeat N] [--json out.json] [--compare baseline.json] [COLLECTION_DIR ...]
+Without collection directories a synthetic collection is generated (see benchmarks.synthetic).
+The embedding cache is disabled so embedding is always measured cold.
+All stages run in one process and ru_maxrss never goes down, so a stage's
+process_peak_rss_mb is the peak of the run up to and including that stage,
+not the memory that stage used on its own.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+from benchmarks.normalizer import raw_lines
+from benchmarks.synthetic import make_collection
+from core.generate_output import rank_sections
+from core.schemas import CorpusBuilder
+from core.sectioner_pymupdf import clean_text, sections_from_lines
+from core.sentences import add_sections
+
+STAGES = ("extraction", "cleaning", "sentence_splitting", "embedding", "ranking")
+# Relative slowdown of a stage's seconds over the baseline that counts as a regression
+DEFAULT_TOLERANCE = 0.10
+
+
+def process_peak_rss_mb():
+    # Cumulative high-water mark of this process; ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _best_of(repeat, fn):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _pdf_paths(collection_dir):
+    with open(os.path.join(collection_dir, "challenge1b_input.json")) as f:
+        input_data = json.load(f)
+    query = input_data["persona"]["role"] + " " + input_data["job_to_be_done"]["task"]
+    return [os.path.join(collection_dir, "PDFs", doc["filename"]) for doc in input_data["documents"]], query
+
+
+def run_stages(pdf_paths, query, repeat):
+    """Runs the stages in order on pdf_paths; each stage consumes the previous stage's output."""
+    from core.embedder import get_embedding, score_corpus
+    results = {}
+
+    def record(stage, seconds, pages=None, sentences=None):
+        results[stage] = {
+            "seconds": seconds,
+            "pages_per_sec": pages / seconds if pages and seconds else None,
+            "sentences_per_sec": sentences / seconds if sentences and seconds else None,
+            "process_peak_rss_mb": process_peak_rss_mb(),
+        }
+
+    seconds, lines_by_doc = _best_of(repeat, lambda: {path: raw_lines(path) for path in pdf_paths})
+    pages = sum(len({line["page"] for line in lines}) for lines in lines_by_doc.values())
+    record("extraction", seconds, pages=pages)
+
+    def clean():
+        sections = []
+        for path, lines in lines_by_doc.items():
+            cleaned = [dict(line, text=text) for line in lines for text in (clean_text(line["text"]),) if text]
+            sections.extend(sections_from_lines(cleaned, os.path.basename(path)))
+        return sections
+    seconds, sections = _best_of(repeat, clean)
+    record("cleaning", seconds, pages=pages)
+
+    def split():
+        builder = CorpusBuilder()
+        add_sections(builder, sections)
+        return builder.build()
+    seconds, corpus = _best_of(repeat, split)
+    record("sentence_splitting", seconds, pages=pages, sentences=corpus.num_sentences)
+
+    # Load the model outside the timed region
+    start = time.perf_counter()
+    query_emb = get_embedding(query)
+    results["model_load"] = {"seconds": time.perf_counter() - start, "process_peak_rss_mb": process_peak_rss_mb()}
+    seconds, _ = _best_of(repeat, lambda: score_corpus(corpus, query_emb))
+    record("embedding", seconds, pages=pages, sentences=corpus.num_sentences)
+
+    seconds, _ = _best_of(repeat, lambda: rank_sections(corpus))
+    record("ranking", seconds, pages=pages, sentences=corpus.num_sentences)
+    return {"pages": pages, "sections": corpus.num_sections, "sentences": corpus.num_sentences,
+            "stages": results}
+
+
+def compare(report, baseline, tolerance):
+    """Returns (stage, baseline seconds, seconds) for every stage slower than baseline by more than tolerance."""
+    regressions = []
+    for stage in STAGES:
+        old = baseline.get("stages", {}).get(stage)
+        new = report["stages"].get(stage)
+        if old and new and new["seconds"] > old["seconds"] * (1 + tolerance):
+            regressions.append((stage, old["seconds"], new["seconds"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("collections", nargs="*")
+    parser.add_argument("--synthetic-docs", type=int, default=3)
+    parser.add_argument("--synthetic-pages", type=int, default=20, help="Pages per synthetic PDF")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing runs per stage; the best is reported")
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--compare", help="Baseline report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    os.environ.pop("PIPELINE_CACHE_DIR", None)
+    pdf_paths, query = [], None
+    with tempfile.TemporaryDirectory() as tmp:
+        if not args.collections:
+            make_collection(tmp, args.synthetic_docs, args.synthetic_pages)
+            args.collections = [tmp]
+        for collection in args.collections:
+            paths, query = _pdf_paths(collection)
+            pdf_paths.extend(paths)
+        report = run_stages(pdf_paths, query, args.repeat)
+    report["environment"] = {"python": platform.python_version(), "machine": platform.machine(),
+                             "cpus": os.cpu_count()}
+
+    print(f"{report['pages']} pages, {report['sections']} sections, {report['sentences']} sentences")
+    for stage in STAGES:
+        r = report["stages"][stage]
+        rates = "  ".join(f"{r[key]:10.1f} {label}" for key, label in
+                          (("pages_per_sec", "pages/s"), ("sentences_per_sec", "sentences/s")) if r[key])
+        print(f"  {stage:20s} {r['seconds']:8.3f} s  {rates}  process peak RSS so far {r['process_peak_rss_mb']:.0f} MB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for stage, old, new in regressions:
+            print(f"REGRESSION {stage}: {old:.3f}s -> {new:.3f}s (+{(new / old - 1):.0%})")
+        print(f"{len(regressions)} regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Measures the import time of each pipeline entry point in a fresh interpreter and
+checks it against a startup budget. None of them may import torch, transformers
+or PyMuPDF at import time; those load on the first parse or embedding call.
+
+Usage: python -m benchmarks.startup [--budget SECONDS] [--runs N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Import time budget per entry point, in seconds
+STARTUP_BUDGET_SECONDS = 0.75
+
+ENTRY_POINTS = [
+    "core.generate_output",
+    "core.sectioner_pymupdf",
+    "core.format",
+    "core.format_mp",
+    "core.process_collections",
+    "core.process_collections_mp",
+]
+
+HEAVY_MODULES = ["torch", "transformers", "fitz"]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, runs):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    timings = []
+    heavy = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=root, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        timings.append(result["seconds"])
+        heavy = result["heavy"]
+    return statistics.median(timings), heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_SECONDS)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    for module in ENTRY_POINTS:
+        seconds, heavy = measure(module, args.runs)
+        over = seconds > args.budget or heavy
+        failed = failed or over
+        status = "OVER BUDGET" if over else "ok"
+        extra = f" (imports {', '.join(heavy)})" if heavy else ""
+        print(f"{module:32s} {seconds * 1000:8.1f} ms  {status}{extra}")
+    print(f"Budget: {args.budget * 1000:.0f} ms per entry point")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Generates synthetic collections of PDFs with PyMuPDF for reproducible benchmarks:
+configurable page count, heading density and bold-font mix.
+
+Usage: python -m benchmarks.synthetic OUT_DIR [--docs N] [--pages N] [--heading-density P] [--bold-mix P] [--seed N]
+OUT_DIR gets PDFs/ and a challenge1b_input.json, like the sample collections.
+"""
+import argparse
+import json
+import os
+import random
+
+WORDS = ("trip plan city beach travel friends college day nightlife hotel museum budget group food "
+         "restaurant tour walk market history wine coast train ticket booking evening guide local "
+         "festival culture adventure relax shopping breakfast dinner itinerary").split()
+# Characters the cleaner normalizes, mixed into body text
+DECORATIONS = ("• ", "ﬁ", "“", "”", "’", "–", "…")
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+MARGIN = 50
+LINE_HEIGHT = 14
+BODY_FONT, BOLD_FONT = "helv", "hebo"
+
+
+def _sentence(rng):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(5, 14))]
+    if rng.random() < 0.3:
+        position = rng.randrange(len(words))
+        words[position] = rng.choice(DECORATIONS) + words[position]
+    return " ".join(words).capitalize() + "."
+
+
+def make_pdf(path, pages=10, heading_density=0.08, bold_mix=0.05, seed=0):
+    """
+    Writes a PDF of body lines in Helvetica with headings in Helvetica-Bold.
+    heading_density is the chance that a line is a heading (2-6 title-case words);
+    bold_mix is the chance that a body line is also set in bold, which exercises
+    the heading heuristics with bold text that is not a heading.
+    """
+    import fitz
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        y = MARGIN
+        while y < PAGE_HEIGHT - MARGIN:
+            if rng.random() < heading_density:
+                text = " ".join(rng.choice(WORDS).title() for _ in range(rng.randint(2, 6)))
+                page.insert_text((MARGIN, y), text, fontname=BOLD_FONT, fontsize=13)
+                y += LINE_HEIGHT + 6
+                continue
+            font = BOLD_FONT if rng.random() < bold_mix else BODY_FONT
+            page.insert_text((MARGIN, y), _sentence(rng), fontname=font, fontsize=10)
+            y += LINE_HEIGHT
+    doc.save(path)
+    doc.close()
+
+
+def make_collection(out_dir, docs=3, pages=10, heading_density=0.08, bold_mix=0.05, seed=0):
+    """Writes docs PDFs and a challenge1b_input.json into out_dir; returns the PDF paths."""
+    pdf_dir = os.path.join(out_dir, "PDFs")
+    os.makedirs(pdf_dir, exist_ok=True)
+    paths = []
+    for i in range(docs):
+        path = os.path.join(pdf_dir, f"synthetic_{i + 1}.pdf")
+        make_pdf(path, pages, heading_density, bold_mix, seed + i)
+        paths.append(path)
+    input_data = {
+        "documents": [{"filename": os.path.basename(path), "title": f"Synthetic {i + 1}"}
+                      for i, path in enumerate(paths)],
+        "persona": {"role": "Travel Planner"},
+        "job_to_be_done": {"task": "Plan a trip of 4 days for a group of 10 college friends."},
+    }
+    with open(os.path.join(out_dir, "challenge1b_input.json"), "w") as f:
+        json.dump(input_data, f, indent=2)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("out_dir")
+    parser.add_argument("--docs", type=int, default=3)
+    parser.add_argument("--pages", type=int, default=10, help="Pages per PDF")
+    parser.add_argument("--heading-density", type=float, default=0.08)
+    parser.add_argument("--bold-mix", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    paths = make_collection(args.out_dir, args.docs, args.pages, args.heading_density, args.bold_mix, args.seed)
+    print(f"Wrote {len(paths)} PDFs of {args.pages} pages to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import zlib
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from .embedding_cache import normalize_sentence
+
+# MinHash signature length, split into LSH bands of NUM_PERMUTATIONS // LSH_BANDS rows
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+# Character shingle length for near-duplicate detection
+SHINGLE_SIZE = 5
+# Prime just above 2**32 for the universal hash family (a * x + b) mod p
+_PRIME = 4294967311
+
+_rng = np.random.default_rng(1234)
+_HASH_A = _rng.integers(1, 1 << 32, NUM_PERMUTATIONS, dtype=np.uint64)
+_HASH_B = _rng.integers(0, 1 << 32, NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+class DedupResult(NamedTuple):
+    unique_texts: List[str]
+    # inverse[i] is the index in unique_texts that input text i maps to
+    inverse: np.ndarray
+    exact_duplicates: int
+    near_duplicates: int
+
+
+class DedupStats(NamedTuple):
+    sentences: int
+    embedded: int
+    exact_duplicates: int
+    near_duplicates: int
+
+    def __add__(self, other):
+        return DedupStats(*(a + b for a, b in zip(self, other)))
+
+    def describe(self):
+        return (f"Deduplication: {self.sentences} sentences, {self.embedded} embedded, "
+                f"{self.sentences - self.embedded} forward passes saved "
+                f"({self.exact_duplicates} exact, {self.near_duplicates} near duplicates)")
+
+
+def _shingles(text):
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(shingles) -> np.ndarray:
+    hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in shingles], dtype=np.uint64)
+    return ((hashes[:, None] * _HASH_A + _HASH_B) % _PRIME).min(axis=0)
+
+
+def _near_duplicate_groups(texts, threshold):
+    """
+    Maps each text to the earliest text it near-duplicates. Candidate pairs come
+    from MinHash LSH bands and are confirmed with the exact shingle Jaccard similarity.
+    """
+    shingles = [_shingles(text) for text in texts]
+    signatures = np.stack([minhash_signature(s) for s in shingles]) if texts else None
+    parent = list(range(len(texts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    rows = NUM_PERMUTATIONS // LSH_BANDS
+    for band in range(LSH_BANDS):
+        buckets = {}
+        for i in range(len(texts)):
+            buckets.setdefault(signatures[i, band * rows:(band + 1) * rows].tobytes(), []).append(i)
+        for members in buckets.values():
+            first = members[0]
+            for other in members[1:]:
+                root_first, root_other = find(first), find(other)
+                if root_first == root_other:
+                    continue
+                union = len(shingles[first] | shingles[other])
+                if union and len(shingles[first] & shingles[other]) / union >= threshold:
+                    parent[max(root_first, root_other)] = min(root_first, root_other)
+    return [find(i) for i in range(len(texts))]
+
+
+def deduplicate(texts: List[str], near_duplicate_threshold: Optional[float] = None) -> DedupResult:
+    """
+    Collapses texts that normalize to the same key (the uncased tokenizer embeds
+    them identically), and optionally near duplicates whose shingle Jaccard
+    similarity is at least near_duplicate_threshold. Each group is represented by
+    its first occurrence.
+    """
+    key_index = {}
+    unique_texts = []
+    inverse = np.empty(len(texts), dtype=np.int64)
+    for i, text in enumerate(texts):
+        key = normalize_sentence(text)
+        index = key_index.get(key)
+        if index is None:
+            index = key_index[key] = len(unique_texts)
+            unique_texts.append(text)
+        inverse[i] = index
+    exact_duplicates = len(texts) - len(unique_texts)
+
+    near_duplicates = 0
+    if near_duplicate_threshold and unique_texts:
+        representatives = _near_duplicate_groups([normalize_sentence(t) for t in unique_texts],
+                                                 near_duplicate_threshold)
+        kept = sorted(set(representatives))
+        remap = np.empty(len(unique_texts), dtype=np.int64)
+        position = {rep: j for j, rep in enumerate(kept)}
+        for i, rep in enumerate(representatives):
+            remap[i] = position[rep]
+        near_duplicates = len(unique_texts) - len(kept)
+        unique_texts = [unique_texts[i] for i in kept]
+        inverse = remap[inverse]
+
+    return DedupResult(unique_texts, inverse, exact_duplicates, near_duplicates)
@@ -1,85 +1,463 @@
 from .sectioner_pymupdf import extract_sections_from_pdf
-from transformers import AutoTokenizer, AutoModel
-import torch
-import torch.nn.functional as F
+import json
+import numpy as np
 import os
+import threading
+import time
 from typing import List
-from .schemas import Section, SentencedSection, SentenceSimilaritySection, SentenceSimilarity
+from .schemas import Corpus, SentencedSection, SentenceSimilaritySection, SentenceSimilarity
+from .sentences import convert_to_sentences
+from .embedding_cache import EmbeddingCache, DEFAULT_MAX_ENTRIES
+from .dedup import DedupStats, deduplicate
+from . import metrics
 
-
-def convert_to_sentences(sections: List[Section])-> List[SentencedSection]:
-    # Converts each section's content into a list of sentences
-    sections_in_sentences = []
-    for section in sections:
-        # Split by fullstop, then strip and filter out empty sentences
-        sentences = [s.strip() for s in section.section_content.split(".") if s.strip()]
-        section_obj = SentencedSection(
-            document=section.document,
-            section_title=section.section_title,
-            section_content=sentences,
-            page_number=section.page_number
-        )
-        sections_in_sentences.append(section_obj)
-    return sections_in_sentences
+# torch, transformers and onnxruntime are imported on first use in load_model, so
+# importing this module (and everything that imports it) does not pay for them
 
 
 def mean_pooling(model_output, attention_mask):
+    import torch
     token_embeddings = model_output[0] #First element of model_output contains all token embeddings
     input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
     return torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(input_mask_expanded.sum(1), min=1e-9)
 
 
-import os
-from transformers import AutoTokenizer, AutoModel
-
 # Set cache directory for offline model loading
 cache_dir = os.path.expanduser("~/.cache")
 
-tokenizer = AutoTokenizer.from_pretrained(
-    'sentence-transformers/all-MiniLM-L6-v2',
-    cache_dir=cache_dir,
-    local_files_only=True  # Force offline mode
-)
-model = AutoModel.from_pretrained(
-    'sentence-transformers/all-MiniLM-L6-v2',
-    cache_dir=cache_dir,
-    local_files_only=True  # Force offline mode
-)
+MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+
+# Load-ready torch artifact written by download_model.py: a frozen TorchScript graph
+# (forward pass, pooling, normalization), the fast tokenizer and their settings
+TORCHSCRIPT_DIR = os.path.join(cache_dir, "torchscript", "all-MiniLM-L6-v2")
+TORCHSCRIPT_FILES = ("model.pt", "tokenizer.json", "artifact.json")
+
+# ONNX exports written by download_model.py (EXPORT_ONNX=1 / QUANTIZE_ONNX=1)
+ONNX_DIR = os.path.join(cache_dir, "onnx", "all-MiniLM-L6-v2")
+ONNX_MODEL_FILES = {
+    "onnx": "model.onnx",
+    "onnx-int8": "model-int8.onnx",
+}
+
+# Inference backends: "torch" is the default and the reference for parity checks
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def get_backend_name():
+    backend = os.environ.get("EMBEDDER_BACKEND", "torch")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown EMBEDDER_BACKEND {backend!r}, expected one of {', '.join(BACKENDS)}")
+    return backend
+
+
+def model_id(backend=None):
+    """Identifier of the embedding model as served by a backend, used to key cached embeddings."""
+    backend = backend or get_backend_name()
+    return MODEL_NAME if backend == "torch" else f"{MODEL_NAME}:{backend}"
+
+
+class TorchBackend:
+    """PyTorch eager forward pass of the Hugging Face model."""
+
+    def __init__(self, model):
+        self.model = model
+        self.hidden_size = model.config.hidden_size
+
+    def encode(self, batch_input):
+        import torch
+        import torch.nn.functional as F
+        inputs = {key: torch.from_numpy(value) for key, value in batch_input.items()}
+        with torch.no_grad():
+            model_output = self.model(**inputs)
+        emb = mean_pooling(model_output, inputs['attention_mask'])
+        return F.normalize(emb, p=2, dim=1).numpy()
+
+
+class TorchScriptBackend:
+    """Frozen TorchScript graph of the torch backend, loaded without importing transformers."""
+
+    def __init__(self, model_path, hidden_size):
+        import torch
+        self.model = torch.jit.load(model_path, map_location="cpu")
+        self.hidden_size = hidden_size
+
+    def encode(self, batch_input):
+        import torch
+        inputs = [torch.from_numpy(batch_input[name]) for name in ("input_ids", "attention_mask", "token_type_ids")]
+        with torch.no_grad():
+            return self.model(*inputs).numpy()
+
+
+class FastTokenizer:
+    """
+    The serialized tokenizers.Tokenizer of the artifact, with the two calls the
+    embedder makes of a transformers tokenizer: unpadded batch encoding and pad().
+    """
+
+    def __init__(self, path, max_length, pad_token_id):
+        from tokenizers import Tokenizer
+        self.tokenizer = Tokenizer.from_file(path)
+        self.tokenizer.no_padding()
+        self.tokenizer.enable_truncation(max_length)
+        self.pad_token_id = pad_token_id
+
+    def __call__(self, sentences, truncation=True):
+        encodings = self.tokenizer.encode_batch(sentences)
+        return {
+            "input_ids": [encoding.ids for encoding in encodings],
+            "token_type_ids": [encoding.type_ids for encoding in encodings],
+            "attention_mask": [encoding.attention_mask for encoding in encodings],
+        }
+
+    def pad(self, encoded, return_tensors="np"):
+        longest = max(len(ids) for ids in encoded["input_ids"])
+        padded = {}
+        for key, rows in encoded.items():
+            array = np.full((len(rows), longest), self.pad_token_id if key == "input_ids" else 0, dtype=np.int64)
+            for i, row in enumerate(rows):
+                array[i, :len(row)] = row
+            padded[key] = array
+        return padded
+
+
+def torchscript_artifact():
+    """The artifact's settings if all its files exist and EMBEDDER_TORCHSCRIPT is not 0, else None."""
+    if os.environ.get("EMBEDDER_TORCHSCRIPT") == "0":
+        return None
+    if not all(os.path.exists(os.path.join(TORCHSCRIPT_DIR, name)) for name in TORCHSCRIPT_FILES):
+        return None
+    with open(os.path.join(TORCHSCRIPT_DIR, "artifact.json")) as f:
+        return json.load(f)
+
+
+class OnnxBackend:
+    """ONNX Runtime session over an exported (optionally int8-quantized) model."""
+
+    def __init__(self, model_path):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # ONNX Runtime ignores OMP_NUM_THREADS, so honour the thread limit explicitly
+        options.intra_op_num_threads = int(os.environ.get("OMP_NUM_THREADS", 0))
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.hidden_size = self.session.get_outputs()[0].shape[-1]
+
+    def encode(self, batch_input):
+        feeds = {key: value.astype(np.int64) for key, value in batch_input.items() if key in self.input_names}
+        token_embeddings = self.session.run(None, feeds)[0]
+        # Same mean pooling and L2 normalization as the torch path, in NumPy
+        mask = batch_input['attention_mask'][..., None].astype(np.float32)
+        emb = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return emb / np.maximum(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12)
+
+
+_tokenizer = None
+_backends = {}
+# One model per process is shared by all its threads. Loading, and each call's
+# tokenization and forward passes, hold this lock: tokenizers and torch modules
+# are not safe to call concurrently, and torch parallelizes every pass itself
+_model_lock = threading.RLock()
+
+
+def load_model(backend=None):
+    """
+    Loads the tokenizer and the given backend (EMBEDDER_BACKEND by default) on the
+    first embedding call and returns both. The tokenizer and torch backend come
+    from the TorchScript artifact when it exists, and from the Hugging Face cache
+    through transformers otherwise.
+    """
+    backend = backend or get_backend_name()
+    if _tokenizer is not None and backend in _backends:
+        return _tokenizer, _backends[backend]
+    with _model_lock:
+        return _load_model(backend)
+
+
+def _load_model(backend):
+    global _tokenizer
+    if _tokenizer is not None and backend in _backends:
+        return _tokenizer, _backends[backend]
+    artifact = torchscript_artifact()
+    start = time.perf_counter()
+    with metrics.timer("model_load"):
+        if _tokenizer is None and artifact is not None:
+            _tokenizer = FastTokenizer(os.path.join(TORCHSCRIPT_DIR, "tokenizer.json"),
+                                       artifact["max_length"], artifact["pad_token_id"])
+        if _tokenizer is None:
+            from transformers import AutoTokenizer
+            _tokenizer = AutoTokenizer.from_pretrained(
+                MODEL_NAME,
+                cache_dir=cache_dir,
+                local_files_only=True  # Force offline mode
+            )
+        if backend not in _backends:
+            if backend == "torch" and artifact is not None:
+                _backends[backend] = TorchScriptBackend(os.path.join(TORCHSCRIPT_DIR, "model.pt"),
+                                                        artifact["hidden_size"])
+            elif backend == "torch":
+                from transformers import AutoModel
+                _backends[backend] = TorchBackend(AutoModel.from_pretrained(
+                    MODEL_NAME,
+                    cache_dir=cache_dir,
+                    local_files_only=True  # Force offline mode
+                ))
+            else:
+                model_path = os.path.join(ONNX_DIR, ONNX_MODEL_FILES[backend])
+                if not os.path.exists(model_path):
+                    raise FileNotFoundError(
+                        f"{model_path} not found; build the image with EXPORT_ONNX=1"
+                        + (" and QUANTIZE_ONNX=1" if backend == "onnx-int8" else "")
+                    )
+                _backends[backend] = OnnxBackend(model_path)
+    if backend != "torch":
+        source = "ONNX export"
+    else:
+        source = "TorchScript artifact" if artifact is not None else "Hugging Face cache"
+    print(f"Loaded {backend} model from the {source} in {time.perf_counter() - start:.2f} s")
+    return _tokenizer, _backends[backend]
+
+
+def preload_for_fork(backend=None):
+    """
+    Loads the tokenizer and model in a parent process about to fork workers, so
+    they all map one physical copy of the weights instead of loading their own.
+    Only the torch backend is preloaded: ONNX Runtime sessions own thread pools
+    that do not survive a fork. torch runs single-threaded while loading so no
+    intra-op thread pool exists yet at fork time; workers set their own thread
+    count. gc.freeze then moves every object allocated so far out of the
+    collector's reach, so collections in the workers do not write to (and copy)
+    the pages holding them.
+    """
+    backend = backend or get_backend_name()
+    if backend != "torch":
+        return False
+    import gc
+    import torch
+    threads = torch.get_num_threads()
+    torch.set_num_threads(1)
+    try:
+        load_model(backend)
+    finally:
+        torch.set_num_threads(threads)
+    gc.collect()
+    gc.freeze()
+    return True
+
+
+# Upper bound on padded tokens (batch size x longest sequence) per forward pass
+DEFAULT_TOKEN_BUDGET = 8192
+
+
+def _length_buckets(order, lengths, token_budget):
+    """
+    Groups sentence indices (sorted longest first) into batches whose padded size,
+    len(batch) * longest length in batch, stays within token_budget.
+    """
+    batch = []
+    for idx in order:
+        # The first index of a batch is its longest sequence
+        if batch and (len(batch) + 1) * lengths[batch[0]] > token_budget:
+            yield batch
+            batch = []
+        batch.append(idx)
+    if batch:
+        yield batch
+
+
+# Persistent embedding caches per backend, enabled by pointing PIPELINE_CACHE_DIR at a writable directory
+_embedding_caches = {}
+
+
+def get_embedding_cache(backend=None):
+    """Returns the shared EmbeddingCache for a backend, or None when PIPELINE_CACHE_DIR is not set."""
+    backend = backend or get_backend_name()
+    cache_root = os.environ.get("PIPELINE_CACHE_DIR")
+    if backend not in _embedding_caches and cache_root:
+        with _model_lock:
+            if backend not in _embedding_caches:
+                _embedding_caches[backend] = EmbeddingCache(
+                    os.path.join(cache_root, "embeddings"),
+                    model_id=model_id(backend),
+                    max_entries=int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+                )
+    return _embedding_caches.get(backend)
+
+
+def embedding_dim(backend=None):
+    cache = get_embedding_cache(backend)
+    if cache is not None and cache.dim:
+        return cache.dim
+    return load_model(backend)[1].hidden_size
+
+
+def _embed_uncached(sentences, token_budget, backend=None):
+    with _model_lock:
+        tokenizer, model = load_model(backend)
+        # Tokenize once without padding to get lengths, then pad each bucket separately
+        encoded = tokenizer(list(sentences), truncation=True)
+        lengths = [len(ids) for ids in encoded['input_ids']]
+        order = sorted(range(len(sentences)), key=lambda i: lengths[i], reverse=True)
+        embeddings = np.empty((len(sentences), model.hidden_size), dtype=np.float32)
+        for batch in _length_buckets(order, lengths, token_budget):
+            batch_input = tokenizer.pad(
+                {key: [encoded[key][i] for i in batch] for key in encoded.keys()},
+                return_tensors='np'
+            )
+            with metrics.timer("forward_pass"):
+                embeddings[batch] = model.encode(dict(batch_input))
+            metrics.observe("embed_batch_size", len(batch))
+        metrics.count("sentences_embedded", len(sentences))
+        return embeddings
+
+
+# Set by the resident server: embed_sentences calls from other threads are queued
+# to its batching thread, which merges them into shared batches
+_micro_batcher = None
+
+
+def set_micro_batcher(batcher):
+    global _micro_batcher
+    _micro_batcher = batcher
+
+
+def embed_sentences(sentences, token_budget=DEFAULT_TOKEN_BUDGET, use_cache=True, backend=None):
+    """
+    Embeds a list of sentences in length-bucketed batches, one forward pass per batch,
+    with the given backend (EMBEDDER_BACKEND by default).
+    Sentences found in the persistent cache skip the model entirely.
+    Returns a (len(sentences), hidden_size) float32 array of L2-normalized embeddings in input order.
+    """
+    if not sentences:
+        return np.empty((0, embedding_dim(backend)), dtype=np.float32)
+    batcher = _micro_batcher
+    if batcher is not None and not batcher.is_worker():
+        return batcher.embed(sentences, token_budget, use_cache, backend)
+    with metrics.timer("embedding"):
+        return _embed_cached(sentences, token_budget, use_cache, backend)
+
+
+def _embed_cached(sentences, token_budget, use_cache, backend):
+    # The cache's sqlite connection is shared by all threads, so the whole
+    # lookup/embed/store round trip holds the model lock
+    with _model_lock:
+        cache = get_embedding_cache(backend) if use_cache else None
+        if cache is None:
+            return _embed_uncached(sentences, token_budget, backend)
+        keys = cache.keys_for(sentences)
+        found = cache.get_many(keys)
+        # Embed each missing key once, even if it occurs several times
+        missing = {}
+        for i, key in enumerate(keys):
+            if key not in found and key not in missing:
+                missing[key] = sentences[i]
+        metrics.count("embedding_cache_hits", sum(key in found for key in keys))
+        metrics.count("embedding_cache_misses", len(missing))
+        if missing:
+            new_embeddings = _embed_uncached(list(missing.values()), token_budget, backend)
+            cache.put_many(list(missing), new_embeddings)
+            found.update(zip(missing, new_embeddings))
+        return np.stack([found[key] for key in keys])
 
 
 def get_embedding(text):
-    encoded_input = tokenizer([text], padding=True, truncation=True, return_tensors='pt')
-    with torch.no_grad():
-        model_output = model(**encoded_input)
-    emb = mean_pooling(model_output, encoded_input['attention_mask'])
-    emb = F.normalize(emb, p=2, dim=1)
-    return emb[0]
+    return embed_sentences([text])[0]
 
 
-def check_sentences_for_persona_job(pdf_path, persona_job) -> List[SentenceSimilaritySection]:
+def score_sentences(sections_in_sentences: List[SentencedSection], persona_job_emb):
     """
-    Given a PDF path, extracts sections, splits into sentences, embeds each sentence,
-    and checks cosine similarity with persona+job from input.json.
-    Returns a list of dicts with sentence and similarity.
+    Embeds every sentence of the given sections in batches and scores it against
+    the persona+job embedding. Since embeddings are normalized, cosine similarity
+    reduces to one matrix-vector product.
+    Returns (scores, offsets): one float64 score per sentence, concatenated across
+    sections, with section i's sentences at scores[offsets[i]:offsets[i + 1]].
     """
-    sections = extract_sections_from_pdf(pdf_path)
-    sections_in_sentences = convert_to_sentences(sections)
-    persona_job_emb = get_embedding(persona_job)
+    sentences = [sentence for section in sections_in_sentences for sentence in section.section_content]
+    scores = (embed_sentences(sentences) @ persona_job_emb).astype(np.float64)
+    offsets = np.zeros(len(sections_in_sentences) + 1, dtype=np.int64)
+    np.cumsum([len(section.section_content) for section in sections_in_sentences], out=offsets[1:])
+    return scores, offsets
+
+
+def near_duplicate_threshold():
+    """Jaccard threshold for collapsing near-duplicate sentences, from NEAR_DUPLICATE_THRESHOLD (off when unset)."""
+    threshold = os.environ.get("NEAR_DUPLICATE_THRESHOLD")
+    return float(threshold) if threshold else None
+
+
+def _embed_corpus(corpus: Corpus):
+    """
+    Embeds each distinct sentence of the corpus once. Sentences that only differ
+    in case or spacing (and near duplicates, if enabled) share one embedding.
+    Returns (embeddings, occurrences, stats): sentence i's embedding is
+    embeddings[occurrences[i]], and stats counts the forward passes saved.
+    """
+    unique_ids, inverse = np.unique(corpus.sentence_ids, return_inverse=True)
+    dedup = deduplicate([corpus.strings[i] for i in unique_ids], near_duplicate_threshold())
+    occurrences = dedup.inverse[inverse]
+    embeddings = embed_sentences(dedup.unique_texts)
+    stats = DedupStats(
+        sentences=corpus.num_sentences,
+        embedded=len(dedup.unique_texts),
+        exact_duplicates=corpus.num_sentences - len(unique_ids) + dedup.exact_duplicates,
+        near_duplicates=dedup.near_duplicates
+    )
+    return embeddings, occurrences, stats
+
+
+def score_corpus(corpus: Corpus, persona_job_emb, keep_embeddings=False) -> DedupStats:
+    """
+    Embeds each distinct sentence of the corpus once and fills corpus.scores with
+    its cosine similarity to the persona+job embedding, fanned back out to every
+    occurrence. With keep_embeddings, the per-sentence embedding matrix is stored
+    on the corpus too.
+    Returns how many forward passes deduplication saved.
+    """
+    embeddings, occurrences, stats = _embed_corpus(corpus)
+    corpus.scores = (embeddings @ persona_job_emb)[occurrences].astype(np.float32)
+    metrics.count("sentences_scored", corpus.num_sentences)
+    if keep_embeddings:
+        corpus.embeddings = embeddings[occurrences]
+    return stats
+
+
+def score_corpus_queries(corpus: Corpus, query_embs):
+    """
+    score_corpus for N queries at once: the corpus is embedded once and scored
+    against the (N, hidden_size) query embeddings in a single matrix multiply.
+    Returns a (num_sentences, N) float32 score matrix and the DedupStats.
+    """
+    embeddings, occurrences, stats = _embed_corpus(corpus)
+    scores = (embeddings @ np.asarray(query_embs).T)[occurrences].astype(np.float32)
+    metrics.count("sentences_scored", corpus.num_sentences * len(query_embs))
+    return scores, stats
+
+
+def score_sentenced_sections(sections_in_sentences: List[SentencedSection], persona_job_emb) -> List[SentenceSimilaritySection]:
+    """Like score_sentences, but returns one SentenceSimilaritySection per section."""
+    scores, offsets = score_sentences(sections_in_sentences, persona_job_emb)
+    scores = scores.tolist()
     results = []
-    for section in sections_in_sentences:
-        similarity_scores = []
-        for sentence in section.section_content:
-            sentence_emb = get_embedding(sentence)
-            cosine_sim = torch.nn.functional.cosine_similarity(sentence_emb, persona_job_emb, dim=0).item()
-            similarity_scores.append(SentenceSimilarity(
-                sentence=sentence,
-                cosine_similarity=cosine_sim
-            ))
+    for i, section in enumerate(sections_in_sentences):
         results.append(SentenceSimilaritySection(
             document=section.document,
             section_title=section.section_title,
-            section_content=similarity_scores,
+            section_content=[
+                SentenceSimilarity(sentence=sentence, cosine_similarity=score)
+                for sentence, score in zip(section.section_content, scores[offsets[i]:offsets[i + 1]])
+            ],
             page_number=section.page_number
         ))
     return results
 
+
+def check_sentences_for_persona_job(pdf_path, persona_job) -> List[SentenceSimilaritySection]:
+    """
+    Given a PDF path, extracts sections, splits into sentences, embeds each sentence,
+    and checks cosine similarity with persona+job from input.json.
+    Returns a list of dicts with sentence and similarity.
+    """
+    sections = extract_sections_from_pdf(pdf_path)
+    sections_in_sentences = convert_to_sentences(sections)
+    persona_job_emb = get_embedding(persona_job)
+    return score_sentenced_sections(sections_in_sentences, persona_job_emb)
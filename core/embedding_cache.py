@@ -0,0 +1,163 @@
+import fcntl
+import hashlib
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# Default cap on cached sentences per model (~300MB of float32 vectors at 384 dims)
+DEFAULT_MAX_ENTRIES = 200_000
+# Rows added to the vector file whenever it has to grow
+GROW_ROWS = 4096
+# SQLite limits the number of bound parameters per statement
+QUERY_CHUNK = 500
+
+
+def normalize_sentence(text):
+    """
+    Normalizes a sentence for content addressing. The uncased MiniLM tokenizer
+    lowercases and splits on whitespace, so variants that differ only in case or
+    spacing produce identical embeddings and can share a cache entry.
+    """
+    return " ".join(text.split()).lower()
+
+
+def sentence_key(text, model_id):
+    return hashlib.sha256(f"{model_id}\n{normalize_sentence(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed store of sentence embeddings shared across runs and processes.
+    Vectors live in a memory-mapped float32 file, and an SQLite index maps keys to
+    rows and tracks last use for LRU eviction. Readers hold a shared file lock and
+    writers an exclusive one, so concurrent workers can share one directory.
+    The vector dimension is recorded on first write, so lookups never need the model.
+    """
+
+    def __init__(self, cache_dir, model_id, dim=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.model_id = model_id
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # One subdirectory per model so every vector file has a single dimension
+        self.cache_dir = os.path.join(cache_dir, hashlib.sha1(model_id.encode("utf-8")).hexdigest()[:16])
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._vectors_path = os.path.join(self.cache_dir, "vectors.f32")
+        self._lock_path = os.path.join(self.cache_dir, "lock")
+        self._vectors = None
+        # Used from whichever single thread embeds (the micro-batcher in server mode)
+        self._db = sqlite3.connect(os.path.join(self.cache_dir, "index.sqlite"), timeout=60,
+                                   isolation_level=None, check_same_thread=False)
+        with self._locked(fcntl.LOCK_EX):
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, row INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            if not os.path.exists(self._vectors_path):
+                open(self._vectors_path, "wb").close()
+        self.dim = dim or self._stored_dim()
+
+    def _stored_dim(self):
+        row = self._db.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        return int(row[0]) if row else None
+
+    @contextmanager
+    def _locked(self, mode):
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _mapped(self, min_rows=0):
+        """Returns the vector file as a (rows, dim) memmap, remapping if another process grew it."""
+        row_bytes = self.dim * 4
+        if self._vectors is None or len(self._vectors) < min_rows:
+            rows = os.path.getsize(self._vectors_path) // row_bytes
+            if rows < min_rows:
+                rows = (min_rows // GROW_ROWS + 1) * GROW_ROWS
+                os.truncate(self._vectors_path, rows * row_bytes)
+            self._vectors = None if rows == 0 else np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r+", shape=(rows, self.dim)
+            )
+        return self._vectors
+
+    def keys_for(self, sentences):
+        return [sentence_key(sentence, self.model_id) for sentence in sentences]
+
+    def get_many(self, keys):
+        """Returns {key: vector} for every cached key and updates hit/miss counts."""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._locked(fcntl.LOCK_SH):
+            rows = {}
+            for start in range(0, len(unique_keys), QUERY_CHUNK):
+                chunk = unique_keys[start:start + QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows.update(self._db.execute(
+                    f"SELECT key, row FROM entries WHERE key IN ({placeholders})", chunk
+                ).fetchall())
+            if rows:
+                self.dim = self.dim or self._stored_dim()
+                vectors = self._mapped(max(rows.values()) + 1)
+                for key, row in rows.items():
+                    found[key] = np.array(vectors[row])
+        if found:
+            now = time.time()
+            self._db.executemany("UPDATE entries SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+        hits = sum(1 for key in keys if key in found)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, keys, vectors):
+        """Stores vectors for keys, evicting least recently used entries beyond max_entries."""
+        entries = dict(zip(keys, vectors))
+        with self._locked(fcntl.LOCK_EX):
+            stored_dim = self._stored_dim()
+            if stored_dim is None:
+                stored_dim = self.dim or len(vectors[0])
+                self._db.execute("INSERT INTO meta (name, value) VALUES ('dim', ?)", (str(stored_dim),))
+            self.dim = stored_dim
+            existing = set()
+            key_list = list(entries)
+            for start in range(0, len(key_list), QUERY_CHUNK):
+                chunk = key_list[start:start + QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                existing.update(key for (key,) in self._db.execute(
+                    f"SELECT key FROM entries WHERE key IN ({placeholders})", chunk
+                ))
+            new_keys = [key for key in key_list if key not in existing][-self.max_entries:]
+            if not new_keys:
+                return
+            count = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            free = max(0, self.max_entries - count)
+            rows = list(range(count, count + min(free, len(new_keys))))
+            evict = len(new_keys) - len(rows)
+            self._db.execute("BEGIN")
+            if evict:
+                victims = self._db.execute(
+                    "SELECT key, row FROM entries ORDER BY last_used LIMIT ?", (evict,)
+                ).fetchall()
+                self._db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in victims])
+                rows.extend(row for _, row in victims)
+            mapped = self._mapped(max(rows) + 1)
+            for key, row in zip(new_keys, rows):
+                mapped[row] = entries[key]
+            mapped.flush()
+            now = time.time()
+            self._db.executemany(
+                "INSERT INTO entries (key, row, last_used) VALUES (?, ?, ?)",
+                [(key, row, now) for key, row in zip(new_keys, rows)]
+            )
+            self._db.execute("COMMIT")
+
+    def summary(self):
+        return f"Embedding cache: {self.hits} hits, {self.misses} misses"
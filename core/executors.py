@@ -0,0 +1,108 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from multiprocessing import Pool, current_process
+
+# Ways to run the parse stage: in the calling thread, in a thread pool sharing this
+# process (and its one model), or in a pool of processes that never load the model
+EXECUTORS = ("serial", "thread", "process")
+
+# Set by the ProcessExecutor pool initializer, so tasks know they run in a parse
+# worker rather than in the process that owns the metrics registry
+_pool_worker = False
+
+
+def executor_kind(default):
+    """PIPELINE_EXECUTOR, or the orchestrator's default when unset."""
+    kind = os.environ.get("PIPELINE_EXECUTOR", default)
+    if kind not in EXECUTORS:
+        raise ValueError(f"Unknown PIPELINE_EXECUTOR {kind!r}, expected one of {', '.join(EXECUTORS)}")
+    return kind
+
+
+def in_pool_worker():
+    """True inside a ProcessExecutor worker; daemonic collection workers that parse in-process are not."""
+    return _pool_worker
+
+
+def _init_pool_worker():
+    global _pool_worker
+    _pool_worker = True
+
+
+class _Executor:
+    kind = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+
+class SerialExecutor(_Executor):
+    """Runs every task in the calling thread."""
+    kind = "serial"
+
+    def map(self, fn, items):
+        return [fn(item) for item in items]
+
+    def imap_unordered(self, fn, items):
+        return map(fn, items)
+
+
+class ThreadExecutor(_Executor):
+    """
+    Thread pool in this process. PyMuPDF is not thread-safe, so the sectioner's
+    lock serializes every open and get_text call: two PDFs are never extracted at
+    once, and only text cleaning and sectioning run alongside. What threads buy is
+    overlap with embedding (torch releases the GIL during forward passes) without a
+    second copy of the model or pickling results; parallel extraction needs the
+    process executor.
+    """
+    kind = "thread"
+
+    def __init__(self, workers):
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="parse")
+
+    def map(self, fn, items):
+        return list(self._pool.map(fn, items))
+
+    def imap_unordered(self, fn, items):
+        futures = [self._pool.submit(fn, item) for item in items]
+        return (future.result() for future in as_completed(futures))
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+class ProcessExecutor(_Executor):
+    """multiprocessing Pool; tasks and results are pickled across processes."""
+    kind = "process"
+
+    def __init__(self, workers):
+        self._pool = Pool(processes=workers, initializer=_init_pool_worker)
+
+    def map(self, fn, items):
+        return self._pool.map(fn, items)
+
+    def imap_unordered(self, fn, items):
+        return self._pool.imap_unordered(fn, items)
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+
+def make_executor(kind, workers) -> _Executor:
+    """
+    An executor of the given kind with this many workers. workers=0 and process
+    pools inside daemonic pool workers, which cannot start children, run serially.
+    """
+    if kind == "serial" or workers <= 0 or (kind == "process" and current_process().daemon):
+        return SerialExecutor()
+    if kind == "thread":
+        return ThreadExecutor(workers)
+    return ProcessExecutor(workers)
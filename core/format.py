@@ -9,10 +9,50 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 # Add parent directory to path 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from .embedder import check_sentences_for_persona_job
-from .generate_output import get_top_5_sections, get_top_5_sentence_groups_per_section, get_extracted_sections
+from .embedder import get_embedding, get_embedding_cache, score_corpus
+from .sectioner_pymupdf import EXTRACTOR_VERSION
+from .section_cache import get_section_cache
+from .schemas import Corpus
+from .pipeline import parse_documents
+from .executors import executor_kind
+from .resources import available_cpus
+from .generate_output import rank_sections
+from .lexical import prefilter_corpus, prefilter_top_n
+from .hierarchical import coarse_candidates, hierarchical_top_k
+from .streaming import run_streaming
+from .incremental import rank_documents_incremental
+from . import metrics
 
-def process_trip_planning_input(input_data):
+
+def rank_documents(documents, persona_job_query):
+    """Parses, scores and ranks all documents of a collection in memory."""
+    # Aggregate sections from all PDFs into one columnar corpus. Filenames are full
+    # paths, set by the caller; PIPELINE_EXECUTOR=thread or process parses them concurrently
+    pdf_paths = [doc['filename'] for doc in documents]
+    corpus = Corpus.concat(parse_documents(pdf_paths, min(available_cpus(), len(pdf_paths)), executor_kind("serial")))
+
+    # Embed every sentence of the collection in batches and score it against the query once
+    persona_job_emb = get_embedding(persona_job_query)
+    corpus = prefilter_corpus(corpus, persona_job_query, prefilter_top_n())
+    corpus = coarse_candidates(corpus, persona_job_emb, hierarchical_top_k())
+    print(score_corpus(corpus, persona_job_emb).describe())
+
+    for cache in (get_section_cache(EXTRACTOR_VERSION), get_embedding_cache()):
+        if cache is not None:
+            print(cache.summary())
+
+    # Rank sections by the mean of their top 3 sentences, keep the top 5,
+    # and join each one's top 5 sentences for the subsection analysis
+    return rank_sections(corpus)
+
+
+def process_trip_planning_input(input_data, document_store=None, rank=rank_documents):
+    """
+    With a ScoredDocumentStore (incremental mode), unchanged documents reuse their
+    stored scores. Streaming, the lexical prefilter and hierarchical scoring pick
+    candidates over the whole collection, so they always recompute it. rank scores
+    a whole collection, rank_documents or format_async.rank_documents.
+    """
     # Extract metadata
     metadata = {
         "input_documents": [doc["filename"] for doc in input_data["documents"]],
@@ -21,29 +61,19 @@ def process_trip_planning_input(input_data):
         "processing_timestamp": datetime.now().isoformat()
     }
 
-    # Aggregate results from all PDFs
-    all_sections = []
-    # PDFs are located in the same collection directory under PDFs/ subfolder
-    collection_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Go up to project root
-    for doc in input_data["documents"]:
-        # The PDF path needs to be determined relative to the collection being processed
-        # This will be handled by the calling function
-        pdf_path = doc['filename']  # This should be the full path passed by the caller
-        try:
-            results = check_sentences_for_persona_job(pdf_path, metadata["persona"] + " " + metadata["job_to_be_done"])
-            all_sections.extend(results)
-        except Exception as e:
-            print(f"Error processing {pdf_path}: {e}")
-
-    # Get top 5 sections (AverageSimilaritySection)
-    top5_avg_sections = get_top_5_sections(all_sections)
-
-    # Get extracted_sections (ExtractedSection)
-    extracted_sections = get_extracted_sections(top5_avg_sections)
+    persona_job_query = metadata["persona"] + " " + metadata["job_to_be_done"]
+    metrics.count("documents", len(input_data["documents"]))
+    with metrics.timer("collection"):
+        if os.environ.get("PIPELINE_STREAMING") == "1":
+            # Constant-memory mode: sections are scored batch by batch as they are read
+            pdf_paths = [doc['filename'] for doc in input_data["documents"]]
+            extracted_sections, subsection_analysis = run_streaming(pdf_paths, persona_job_query)
+        elif document_store is not None and prefilter_top_n() is None and hierarchical_top_k() is None:
+            extracted_sections, subsection_analysis = rank_documents_incremental(
+                input_data["documents"], persona_job_query, document_store)
+        else:
+            extracted_sections, subsection_analysis = rank(input_data["documents"], persona_job_query)
     extracted_sections_dicts = [sec.model_dump() for sec in extracted_sections]
-
-    # Get subsection_analysis (SubsectionAnalysis)
-    subsection_analysis = get_top_5_sentence_groups_per_section(top5_avg_sections)
     subsection_analysis_dicts = [sub.model_dump() for sub in subsection_analysis]
 
     output = {
@@ -63,6 +93,7 @@ if __name__ == "__main__":
     result = process_trip_planning_input(input_data)
     with open(output_path, 'w') as f:
         json.dump(result, f, indent=2)
+    metrics.write_sidecar(output_path)
 
     end = datetime.now()
     print(f"Processing completed in {end - start} seconds")
\ No newline at end of file
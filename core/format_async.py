@@ -0,0 +1,183 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from multiprocessing import cpu_count, current_process
+
+from .pipeline import EMBED_BATCH_SENTENCES, parse_document, _flush, _score_candidates
+from .schemas import Corpus
+from .dedup import DedupStats
+from .lexical import prefilter_top_n
+from .hierarchical import hierarchical_top_k
+from .generate_output import rank_sections
+from .sectioner_pymupdf import EXTRACTOR_VERSION
+from .section_cache import get_section_cache
+from . import format
+from . import format_mp
+from . import metrics
+
+# Parsed documents waiting for the embedding stage before parse workers stop taking new ones
+PARSED_QUEUE_SIZE = 4
+# Threads reading upcoming PDFs into the page cache ahead of their parse
+PREFETCH_THREADS = 2
+
+
+def _prefetch(pdf_path):
+    """I/O stage: pulls a PDF into the OS page cache so its parse does not wait on the disk."""
+    try:
+        with open(pdf_path, "rb") as f:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+            else:
+                while f.read(1 << 20):
+                    pass
+    except OSError:
+        pass  # the parse stage reports unreadable files
+
+
+def _init_parse_worker():
+    # Documents are already spread over the workers, so none of them shards pages
+    os.environ["PIPELINE_PAGE_SHARDS"] = "1"
+
+
+def _parse_in_worker(task):
+    """parse_document for ProcessPoolExecutor workers, which are not daemonic: returns this document's metrics."""
+    metrics.reset()
+    index, corpus, _ = parse_document(task)
+    return index, corpus, metrics.snapshot()
+
+
+async def run_pipeline_async(pdf_paths, persona_job, num_parse_workers=None,
+                             batch_sentences=EMBED_BATCH_SENTENCES) -> Corpus:
+    """
+    Same contract as pipeline.run_pipeline, with the three stages overlapped on one
+    event loop: upcoming PDFs are prefetched by I/O threads, parsed in a process
+    pool, and handed through a bounded queue to a single embedding thread, which
+    owns the model. At most num_parse_workers + PARSED_QUEUE_SIZE parsed documents
+    are held ahead of the embedder; beyond that, parsing waits (backpressure).
+    num_parse_workers=0 parses in a thread of this process.
+    """
+    loop = asyncio.get_running_loop()
+    top_n = prefilter_top_n()
+    top_k = hierarchical_top_k()
+    select_candidates = top_n is not None or top_k is not None
+    if num_parse_workers is None:
+        num_parse_workers = min(cpu_count(), len(pdf_paths))
+    if current_process().daemon:
+        # Daemonic processes cannot start children
+        num_parse_workers = 0
+    tasks = list(enumerate(pdf_paths))
+
+    io_pool = ThreadPoolExecutor(PREFETCH_THREADS)
+    embed_pool = ThreadPoolExecutor(1)
+    if num_parse_workers > 0 and tasks:
+        parse_pool = ProcessPoolExecutor(num_parse_workers, initializer=_init_parse_worker)
+        parse = _parse_in_worker
+        # Start the workers before the model is imported, so they stay lightweight
+        await asyncio.gather(*(loop.run_in_executor(parse_pool, os.getpid) for _ in range(num_parse_workers)))
+    else:
+        parse_pool = ThreadPoolExecutor(1)
+        parse = parse_document
+    parse_slots = asyncio.Semaphore(max(num_parse_workers, 1))
+    parsed = asyncio.Queue(PARSED_QUEUE_SIZE)
+
+    async def parse_one(task):
+        async with parse_slots:
+            await loop.run_in_executor(io_pool, _prefetch, task[1])
+            result = await loop.run_in_executor(parse_pool, parse, task)
+            # Holding the slot until the queue has room is what bounds parsing
+            await parsed.put(result)
+
+    async def produce():
+        try:
+            await asyncio.gather(*(parse_one(task) for task in tasks))
+        finally:
+            await parsed.put(None)
+
+    try:
+        producer = asyncio.create_task(produce())
+
+        def load_query():
+            from .embedder import get_embedding
+            return get_embedding(persona_job)
+        # The model loads on the embedding thread while the first documents are parsed
+        persona_job_emb = loop.run_in_executor(embed_pool, load_query)
+
+        scored = {}
+        flushes = []
+        pending = []
+        pending_sentences = 0
+        while (item := await parsed.get()) is not None:
+            index, corpus, worker_metrics = item
+            if worker_metrics is not None:
+                metrics.merge(worker_metrics)
+            pending.append((index, corpus))
+            pending_sentences += corpus.num_sentences
+            if not select_candidates and pending_sentences >= batch_sentences:
+                # Queued behind earlier batches on the embedding thread; parsing carries on meanwhile
+                flushes.append(loop.run_in_executor(embed_pool, _flush, pending, await persona_job_emb, scored))
+                pending = []
+                pending_sentences = 0
+        await producer
+        if select_candidates:
+            return await loop.run_in_executor(
+                embed_pool, _score_candidates, pending, tasks, persona_job, await persona_job_emb, top_n, top_k)
+        flushes.append(loop.run_in_executor(embed_pool, _flush, pending, await persona_job_emb, scored))
+        stats = DedupStats(0, 0, 0, 0)
+        for batch_stats in await asyncio.gather(*flushes):
+            stats += batch_stats
+    finally:
+        for pool in (parse_pool, io_pool, embed_pool):
+            pool.shutdown(wait=True)
+
+    print(stats.describe())
+
+    return Corpus.concat(scored[index] for index, _ in tasks)
+
+
+def run_pipeline(pdf_paths, persona_job, num_parse_workers=None,
+                 batch_sentences=EMBED_BATCH_SENTENCES) -> Corpus:
+    """Synchronous entry point for run_pipeline_async, interchangeable with pipeline.run_pipeline."""
+    return asyncio.run(run_pipeline_async(pdf_paths, persona_job, num_parse_workers, batch_sentences))
+
+
+def rank_documents(documents, persona_job_query, num_processes=None):
+    """format.rank_documents on the asyncio orchestrator; filenames are full paths."""
+    corpus = run_pipeline([doc["filename"] for doc in documents], persona_job_query, num_processes)
+    from .embedder import get_embedding_cache
+    for cache in (get_section_cache(EXTRACTOR_VERSION), get_embedding_cache()):
+        if cache is not None:
+            print(cache.summary())
+    return rank_sections(corpus)
+
+
+def process_trip_planning_input(input_data, num_processes=None, document_store=None):
+    """
+    Drop-in replacement for format_mp.process_trip_planning_input and, with
+    document_store or PIPELINE_STREAMING=1, for format.process_trip_planning_input:
+    those runs take core.format's incremental and streaming paths, and collections
+    it scores in full go through the asyncio orchestrator.
+    """
+    if document_store is not None or os.environ.get("PIPELINE_STREAMING") == "1":
+        return format.process_trip_planning_input(
+            input_data, document_store, rank=partial(rank_documents, num_processes=num_processes))
+    return format_mp.process_trip_planning_input(input_data, num_processes, pipeline=run_pipeline)
+
+
+if __name__ == "__main__":
+
+    start = datetime.now()
+    input_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'input.json')
+    output_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'output.json')
+    with open(input_path, 'r') as f:
+        input_data = json.load(f)
+    result = process_trip_planning_input(input_data)
+    with open(output_path, 'w') as f:
+        json.dump(result, f, indent=2)
+    metrics.write_sidecar(output_path)
+
+    end = datetime.now()
+
+    print(f"Processing completed in {end - start} seconds")
@@ -3,43 +3,20 @@ import json
 import os
 import sys
 from datetime import datetime
-from multiprocessing import Pool
-from functools import partial
 
 # Add current directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 # Add parent directory to path 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from embedder import check_sentences_for_persona_job
-from generate_output import get_top_5_sections, get_top_5_sentence_groups_per_section, get_extracted_sections
-
-
-def process_single_document_safe(doc_filename, data_dir, persona_job_query):
-    """
-    Process a single document with error handling.
-    This version imports the embedder inside the function to avoid serialization issues.
-    """
-    # Import inside the function to avoid multiprocessing serialization issues
-    import sys
-    import os
-    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    
-    from embedder import check_sentences_for_persona_job
-    
-    pdf_path = os.path.join(data_dir, doc_filename)
-    try:
-        print(f"Processing {doc_filename}...")
-        results = check_sentences_for_persona_job(pdf_path, persona_job_query)
-        print(f"Completed {doc_filename} - found {len(results)} sections")
-        return results
-    except Exception as e:
-        print(f"Error processing {pdf_path}: {e}")
-        return []
-
-
-def process_trip_planning_input(input_data, num_processes=None):
+from .pipeline import run_pipeline
+from .resources import plan_resources, apply_thread_limits, PARSE_WORKER_MEMORY_BYTES
+from .generate_output import rank_sections
+from . import metrics
+
+
+def process_trip_planning_input(input_data, num_processes=None, pipeline=run_pipeline):
+    """pipeline is the parse/embed orchestrator, pipeline.run_pipeline or format_async.run_pipeline."""
     # Extract metadata
     metadata = {
         "input_documents": [doc["filename"] for doc in input_data["documents"]],
@@ -48,55 +25,41 @@ def process_trip_planning_input(input_data, num_processes=None):
         "processing_timestamp": datetime.now().isoformat()
     }
 
-    # Aggregate results from all PDFs using multiprocessing
-    all_sections = []
+    # Aggregate results from all PDFs: parse workers feed a single embedding stage
     data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
     persona_job_query = metadata["persona"] + " " + metadata["job_to_be_done"]
-    
-    # Use multiprocessing for parallel document processing
+    pdf_paths = [os.path.join(data_dir, doc['filename']) for doc in input_data["documents"]]
+
+    # Parsing is lightweight and scales to all cores; only this process loads the model
+    # The embedding stage is the only model user, so its threads get every core
+    plan = plan_resources(len(pdf_paths), worker_memory=PARSE_WORKER_MEMORY_BYTES, model_processes=1)
+    print(plan.describe())
     if num_processes is None:
-        # Limit to 2 processes to avoid memory issues with transformer models
-        # Each process loads the full model, so fewer processes may be faster
-        num_processes = min(2, len(input_data["documents"]))
-    
-    print(f"Processing {len(input_data['documents'])} documents using {num_processes} processes...")
-    
-    # Prepare arguments for multiprocessing - just pass filenames
-    doc_filenames = [doc['filename'] for doc in input_data["documents"]]
-    
-    # Create a partial function with fixed arguments
-    process_func = partial(process_single_document_safe, 
-                          data_dir=data_dir, 
-                          persona_job_query=persona_job_query)
-    
-    try:
-        # Use multiprocessing
-        with Pool(processes=num_processes) as pool:
-            # Map the processing function to all documents
-            results_list = pool.map(process_func, doc_filenames)
-        
-        # Flatten the results
-        for results in results_list:
-            all_sections.extend(results)
-    except Exception as e:
-        print(f"Multiprocessing failed: {e}")
-        print("Falling back to sequential processing...")
-        # Fallback to sequential processing
-        for filename in doc_filenames:
-            results = process_func(filename)
-            all_sections.extend(results)
-
-    print(f"Total sections collected: {len(all_sections)}")
-
-    # Get top 5 sections (AverageSimilaritySection)
-    top5_avg_sections = get_top_5_sections(all_sections)
-
-    # Get extracted_sections (ExtractedSection)
-    extracted_sections = get_extracted_sections(top5_avg_sections)
+        num_processes = plan.processes
+    apply_thread_limits(plan.threads_per_process)
+
+    print(f"Processing {len(pdf_paths)} documents using {num_processes} parse workers...")
+
+    metrics.count("documents", len(pdf_paths))
+    with metrics.timer("collection"):
+        try:
+            corpus = pipeline(pdf_paths, persona_job_query, num_parse_workers=num_processes)
+        except Exception as e:
+            print(f"Multiprocessing failed: {e}")
+            print("Falling back to sequential processing...")
+            corpus = pipeline(pdf_paths, persona_job_query, num_parse_workers=0)
+
+        from .embedder import get_embedding_cache
+        cache = get_embedding_cache()
+        if cache is not None:
+            print(cache.summary())
+
+        print(f"Total sections collected: {corpus.num_sections}")
+
+        # Rank sections by the mean of their top 3 sentences, keep the top 5,
+        # and join each one's top 5 sentences for the subsection analysis
+        extracted_sections, subsection_analysis = rank_sections(corpus)
     extracted_sections_dicts = [sec.model_dump() for sec in extracted_sections]
-
-    # Get subsection_analysis (SubsectionAnalysis)
-    subsection_analysis = get_top_5_sentence_groups_per_section(top5_avg_sections)
     subsection_analysis_dicts = [sub.model_dump() for sub in subsection_analysis]
 
     output = {
@@ -117,6 +80,7 @@ if __name__ == "__main__":
     result = process_trip_planning_input(input_data)
     with open(output_path, 'w') as f:
         json.dump(result, f, indent=2)
+    metrics.write_sidecar(output_path)
 
     end = datetime.now()
 
@@ -1,5 +1,9 @@
-from .schemas import SentenceSimilaritySection, AverageSimilaritySection, SubsectionAnalysis, ExtractedSection
-from typing import List
+from .schemas import Corpus, SentenceSimilaritySection, AverageSimilaritySection, SubsectionAnalysis, ExtractedSection
+from typing import List, Tuple
+import heapq
+import numpy as np
+
+from . import metrics
 
 def get_top_5_sections(results: List[SentenceSimilaritySection]) -> List[AverageSimilaritySection]:
     """
@@ -54,3 +58,139 @@ def get_top_5_sentence_groups_per_section(results: List[AverageSimilaritySection
             page_number=section.page_number
         ))
     return analyses
+
+
+def segment_top_k_means(scores, offsets, k=3) -> np.ndarray:
+    """
+    Mean of the k highest scores in each segment scores[offsets[i]:offsets[i+1]],
+    or 0.0 for an empty segment. Segments are padded into length buckets (powers of
+    two) and reduced with np.partition, so no segment is fully sorted.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    lengths = np.diff(offsets)
+    means = np.zeros(len(lengths))
+    buckets = np.ceil(np.log2(np.maximum(lengths, 1))).astype(np.int64)
+    for bucket in np.unique(buckets[lengths > 0]):
+        segments = np.flatnonzero((buckets == bucket) & (lengths > 0))
+        width = max(int(lengths[segments].max()), k)
+        columns = np.arange(width)
+        valid = columns < lengths[segments][:, None]
+        index = np.minimum(offsets[segments][:, None] + columns, len(scores) - 1)
+        padded = np.where(valid, scores[index], -np.inf)
+        top = np.partition(padded, width - k, axis=1)[:, width - k:]
+        # Add in descending order, as sum(sorted(...)[:k]) does, so means match exactly
+        top = np.sort(top, axis=1)[:, ::-1]
+        total = np.zeros(len(segments))
+        for column in range(k):
+            total = total + np.where(np.isfinite(top[:, column]), top[:, column], 0.0)
+        means[segments] = total / np.minimum(lengths[segments], k)
+    return means
+
+
+def top_k_indices(values, k) -> np.ndarray:
+    """
+    Indices of the k largest values in descending order. Ties keep input order,
+    matching sorted(..., reverse=True)[:k].
+    """
+    values = np.asarray(values)
+    if len(values) > k:
+        candidates = np.argpartition(-values, k - 1)[:k]
+        # Keep everything tied with the k-th value so the stable tie-break below is exact
+        candidates = np.flatnonzero(values >= values[candidates].min())
+    else:
+        candidates = np.arange(len(values))
+    order = np.lexsort((candidates, -values[candidates]))
+    return candidates[order][:k]
+
+
+def rank_sections(corpus: Corpus, top_sections=5,
+                  top_sentences=5) -> Tuple[List[ExtractedSection], List[SubsectionAnalysis]]:
+    """
+    NumPy ranking path over a scored Corpus, equivalent to get_top_5_sections
+    followed by get_extracted_sections and get_top_5_sentence_groups_per_section.
+    Pydantic models are only created for the returned output rows.
+    """
+    with metrics.timer("ranking"):
+        return _rank_sections(corpus, top_sections, top_sentences)
+
+
+def _rank_sections(corpus, top_sections, top_sentences):
+    scores = corpus.scores.astype(np.float64)
+    offsets = corpus.section_offsets
+    means = segment_top_k_means(scores, offsets, k=3)
+    best = top_k_indices(means, top_sections)
+    extracted_sections = []
+    subsection_analysis = []
+    for rank, i in enumerate(best):
+        section = corpus.section(i)
+        extracted_sections.append(ExtractedSection(
+            document=section.document,
+            section_title=section.section_title,
+            importance_rank=rank + 1,
+            page_number=section.page_number
+        ))
+        sentences = section.sentences
+        top_sentences_idx = top_k_indices(scores[offsets[i]:offsets[i + 1]], top_sentences)
+        subsection_analysis.append(SubsectionAnalysis(
+            document=section.document,
+            refined_text=" ".join(sentences[j] for j in top_sentences_idx),
+            page_number=section.page_number
+        ))
+    return extracted_sections, subsection_analysis
+
+
+class TopSectionAccumulator:
+    """
+    Bounded top-k over scored Corpus batches. Keeps only the best top_sections
+    sections seen so far, ranked exactly as rank_sections ranks the whole corpus:
+    by the mean of the top 3 sentence scores, ties going to the earlier section.
+    """
+
+    def __init__(self, top_sections=5, top_sentences=5):
+        self.top_sections = top_sections
+        self.top_sentences = top_sentences
+        # Min-heap of (mean, -section index, document, title, page, refined text)
+        self._heap = []
+        self._sections_seen = 0
+
+    def add(self, corpus: Corpus):
+        with metrics.timer("ranking"):
+            self._add(corpus)
+
+    def _add(self, corpus):
+        scores = corpus.scores.astype(np.float64)
+        offsets = corpus.section_offsets
+        means = segment_top_k_means(scores, offsets, k=3)
+        for i in (top_k_indices(means, self.top_sections) if len(means) else []):
+            key = (float(means[i]), -(self._sections_seen + int(i)))
+            if len(self._heap) >= self.top_sections and key <= self._heap[0][:2]:
+                break
+            section = corpus.section(i)
+            sentences = section.sentences
+            top_sentences_idx = top_k_indices(scores[offsets[i]:offsets[i + 1]], self.top_sentences)
+            entry = key + (section.document, section.section_title, section.page_number,
+                           " ".join(sentences[j] for j in top_sentences_idx))
+            if len(self._heap) < self.top_sections:
+                heapq.heappush(self._heap, entry)
+            else:
+                heapq.heapreplace(self._heap, entry)
+        self._sections_seen += corpus.num_sections
+
+    def result(self) -> Tuple[List[ExtractedSection], List[SubsectionAnalysis]]:
+        extracted_sections = []
+        subsection_analysis = []
+        for rank, (_, _, document, section_title, page_number, refined_text) in enumerate(
+                sorted(self._heap, reverse=True)):
+            extracted_sections.append(ExtractedSection(
+                document=document,
+                section_title=section_title,
+                importance_rank=rank + 1,
+                page_number=page_number
+            ))
+            subsection_analysis.append(SubsectionAnalysis(
+                document=document,
+                refined_text=refined_text,
+                page_number=page_number
+            ))
+        return extracted_sections, subsection_analysis
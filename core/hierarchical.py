@@ -0,0 +1,42 @@
+import os
+from typing import List, Optional
+
+import numpy as np
+
+from .schemas import Corpus
+from .generate_output import top_k_indices
+
+# Words of section body embedded after the title for the coarse section score
+SECTION_SUMMARY_WORDS = 128
+
+
+def hierarchical_top_k() -> Optional[int]:
+    """Sections kept for sentence scoring, from HIERARCHICAL_TOP_K, or None for flat scoring."""
+    value = os.environ.get("HIERARCHICAL_TOP_K")
+    return int(value) if value else None
+
+
+def section_summaries(corpus: Corpus, max_words=SECTION_SUMMARY_WORDS) -> List[str]:
+    """Each section's title followed by the first max_words words of its body."""
+    summaries = []
+    for section in corpus.sections():
+        body = ". ".join(section.sentences).split()[:max_words]
+        summaries.append(section.section_title + ". " + " ".join(body))
+    return summaries
+
+
+def coarse_candidates(corpus: Corpus, persona_job_emb, top_k) -> Corpus:
+    """
+    Coarse stage of hierarchical scoring: embeds one summary per section and
+    keeps the top_k sections by its similarity to the persona + job embedding,
+    in their original order. Only these go on to sentence-level scoring and
+    ranking. top_k=None keeps every section.
+    """
+    if top_k is None or corpus.num_sections <= top_k:
+        return corpus
+    from .embedder import embed_sentences
+    section_scores = embed_sentences(section_summaries(corpus)) @ persona_job_emb
+    candidates = corpus.select_sections(np.sort(top_k_indices(section_scores, top_k)))
+    print(f"Hierarchical scoring: {corpus.num_sections} section embeddings, {candidates.num_sections} sections "
+          f"({candidates.num_sentences} of {corpus.num_sentences} sentences) kept for sentence scoring")
+    return candidates
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+from . import metrics
+from .schemas import Corpus, CorpusBuilder
+from .section_cache import file_hash
+from .sectioner_pymupdf import EXTRACTOR_VERSION, extract_sections_from_pdf
+from .sentences import add_sections
+from .generate_output import rank_sections
+
+# Bump whenever scoring or ranking output changes, so manifests and stored scores are invalidated
+PIPELINE_VERSION = "1"
+
+MANIFEST_NAME = "challenge1b_manifest.json"
+# Per-document scored corpora, inside the collection directory
+SCORED_DIR = ".scored"
+
+# Settings that change the output; a manifest only matches under the same values
+OUTPUT_ENV_VARS = ("EMBEDDER_BACKEND", "NEAR_DUPLICATE_THRESHOLD", "LEXICAL_PREFILTER_TOP_N",
+                   "HIERARCHICAL_TOP_K", "PIPELINE_STREAMING")
+
+
+def incremental_enabled():
+    return os.environ.get("PIPELINE_INCREMENTAL") == "1"
+
+
+def pipeline_version():
+    """Pipeline, extractor and model versions plus output-affecting settings, hashed."""
+    from .embedder import get_backend_name, model_id
+    parts = [PIPELINE_VERSION, EXTRACTOR_VERSION, model_id(get_backend_name())]
+    parts += [f"{name}={os.environ.get(name, '')}" for name in OUTPUT_ENV_VARS]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def query_hash(input_data):
+    query = input_data["persona"]["role"] + " " + input_data["job_to_be_done"]["task"]
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+def build_manifest(input_json_path, input_data, pdf_dir) -> dict:
+    """Content hashes of the input JSON and every listed PDF, with the pipeline version."""
+    documents = {}
+    for doc in input_data["documents"]:
+        path = os.path.join(pdf_dir, doc["filename"])
+        documents[os.path.basename(path)] = file_hash(path) if os.path.exists(path) else None
+    return {
+        "pipeline_version": pipeline_version(),
+        "input_hash": file_hash(input_json_path),
+        "query_hash": query_hash(input_data),
+        "documents": documents,
+    }
+
+
+def load_manifest(collection_path) -> Optional[dict]:
+    try:
+        with open(os.path.join(collection_path, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(collection_path, manifest):
+    path = os.path.join(collection_path, MANIFEST_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class ScoredDocumentStore:
+    """
+    Scored Corpus of each document of a collection, keyed by document name, PDF
+    hash, query and pipeline version, so unchanged documents skip extraction and
+    embedding when only other PDFs of the collection changed.
+    """
+
+    def __init__(self, collection_path, manifest):
+        self.directory = os.path.join(collection_path, SCORED_DIR)
+        self.manifest = manifest
+        self.used = set()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key_for(self, filename):
+        document_hash = self.manifest["documents"].get(filename)
+        if document_hash is None:
+            return None
+        parts = (self.manifest["pipeline_version"], self.manifest["query_hash"], filename, document_hash)
+        return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def load(self, key) -> Optional[Corpus]:
+        try:
+            with np.load(self._path(key), allow_pickle=False) as arrays:
+                corpus = Corpus.from_arrays(arrays)
+        except (OSError, ValueError, KeyError):
+            return None
+        self.used.add(key)
+        return corpus
+
+    def store(self, key, corpus: Corpus):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, **corpus.to_arrays())
+        os.replace(tmp_path, path)
+        self.used.add(key)
+
+    def prune(self):
+        """Deletes stored documents that the last run did not use."""
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz") and name[:-len(".npz")] not in self.used:
+                os.remove(os.path.join(self.directory, name))
+
+
+def prepare_collection(collection_path, input_json_path, input_data, output_json_path):
+    """
+    Incremental mode for one collection. Returns (skip, store): skip when the
+    manifest and output show nothing changed, otherwise a ScoredDocumentStore to
+    pass to format.process_trip_planning_input, or (False, None) when off.
+    """
+    if not incremental_enabled():
+        return False, None
+    manifest = build_manifest(input_json_path, input_data, os.path.join(collection_path, "PDFs"))
+    if manifest == load_manifest(collection_path) and os.path.exists(output_json_path):
+        return True, None
+    return False, ScoredDocumentStore(collection_path, manifest)
+
+
+def finish_collection(collection_path, store):
+    """Records the manifest after a successful incremental run and drops stale stored documents."""
+    if store is not None:
+        write_manifest(collection_path, store.manifest)
+        store.prune()
+
+
+def rank_documents_incremental(documents, persona_job_query, store: ScoredDocumentStore):
+    """
+    Like format.rank_documents, but documents found in the store keep their
+    stored scores; only new or changed documents are extracted and embedded
+    (together, in one batch) before the collection is ranked again.
+    """
+    from .embedder import get_embedding, score_corpus
+    corpora = {}
+    changed = []
+    for i, doc in enumerate(documents):
+        filename = os.path.basename(doc["filename"])
+        key = store.key_for(filename)
+        corpus = store.load(key) if key else None
+        if corpus is None:
+            changed.append((i, key, doc["filename"]))
+        else:
+            corpora[i] = corpus
+    metrics.count("documents_reused", len(corpora))
+    metrics.count("documents_rescored", len(changed))
+    print(f"Incremental: {len(corpora)} documents reused, {len(changed)} re-extracted and re-scored")
+
+    if changed:
+        fresh = []
+        for i, key, pdf_path in changed:
+            builder = CorpusBuilder()
+            try:
+                add_sections(builder, extract_sections_from_pdf(pdf_path))
+            except Exception as e:
+                print(f"Error processing {pdf_path}: {e}")
+                builder = CorpusBuilder()
+            fresh.append((i, key, builder.build()))
+        batch = Corpus.concat(corpus for _, _, corpus in fresh)
+        print(score_corpus(batch, get_embedding(persona_job_query)).describe())
+        start = 0
+        for i, key, corpus in fresh:
+            corpus.scores = batch.scores[start:start + corpus.num_sentences]
+            start += corpus.num_sentences
+            if key:
+                store.store(key, corpus)
+            corpora[i] = corpus
+
+    return rank_sections(Corpus.concat(corpora[i] for i in range(len(documents))))
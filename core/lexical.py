@@ -0,0 +1,93 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import Optional
+
+import numpy as np
+
+from .schemas import Corpus
+from .generate_output import top_k_indices
+
+# Okapi BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """In-memory inverted index over sections, scored with Okapi BM25."""
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        # term -> (section indices, term frequencies)
+        self.postings = {}
+        self.lengths = []
+
+    def add(self, text):
+        """Indexes the next section."""
+        tokens = tokenize(text)
+        section = len(self.lengths)
+        for term, tf in Counter(tokens).items():
+            ids, tfs = self.postings.setdefault(term, ([], []))
+            ids.append(section)
+            tfs.append(tf)
+        self.lengths.append(len(tokens))
+
+    @classmethod
+    def from_corpus(cls, corpus: Corpus, **kwargs) -> "BM25Index":
+        """Indexes each section of the corpus as its title followed by its sentences."""
+        index = cls(**kwargs)
+        for section in corpus.sections():
+            index.add(section.section_title + " " + " ".join(section.sentences))
+        return index
+
+    def scores(self, query) -> np.ndarray:
+        """BM25 score of every indexed section for the query."""
+        num_sections = len(self.lengths)
+        lengths = np.asarray(self.lengths, dtype=np.float64)
+        average_length = lengths.mean() if num_sections and lengths.mean() > 0 else 1.0
+        scores = np.zeros(num_sections)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            ids = np.asarray(posting[0])
+            tf = np.asarray(posting[1], dtype=np.float64)
+            idf = math.log(1 + (num_sections - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[ids] / average_length)
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+
+def prefilter_top_n() -> Optional[int]:
+    """Number of sections the lexical prefilter keeps, from LEXICAL_PREFILTER_TOP_N, or None when off."""
+    value = os.environ.get("LEXICAL_PREFILTER_TOP_N")
+    return int(value) if value else None
+
+
+def lexical_candidates(corpus: Corpus, query, top_n) -> np.ndarray:
+    """Indices of the top_n sections by BM25 score against the query, in corpus order."""
+    if top_n is None or corpus.num_sections <= top_n:
+        return np.arange(corpus.num_sections)
+    return np.sort(top_k_indices(BM25Index.from_corpus(corpus).scores(query), top_n))
+
+
+def prefilter_corpus(corpus: Corpus, query, top_n) -> Corpus:
+    """
+    Cheap first stage before dense scoring: keeps only the top_n sections by BM25
+    score, in their original order so ranking ties still go to the earlier
+    section. top_n=None keeps every section (exhaustive mode).
+    """
+    if top_n is None or corpus.num_sections <= top_n:
+        return corpus
+    candidates = corpus.select_sections(lexical_candidates(corpus, query, top_n))
+    print(f"Lexical prefilter: {candidates.num_sections} of {corpus.num_sections} sections, "
+          f"{candidates.num_sentences} of {corpus.num_sentences} sentences kept for embedding")
+    return candidates
@@ -0,0 +1,134 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Per-process registry; pool workers send theirs back with snapshot() and the parent merges them
+_timers = {}
+_counters = {}
+_observations = {}
+_documents = {}
+_profile_runs = 0
+# Parse threads and the embedding thread update the registry concurrently in thread mode
+_lock = threading.RLock()
+
+
+def reset():
+    """Clears all metrics, e.g. before a pool worker starts its next collection."""
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _observations.clear()
+        _documents.clear()
+
+
+def count(name, n=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def observe(name, value):
+    """Records a value (such as a batch size) summarized as count/total/min/max."""
+    with _lock:
+        stats = _observations.get(name)
+        if stats is None:
+            _observations[name] = {"count": 1, "total": value, "min": value, "max": value}
+        else:
+            stats["count"] += 1
+            stats["total"] += value
+            stats["min"] = min(stats["min"], value)
+            stats["max"] = max(stats["max"], value)
+
+
+def record_document(document, seconds):
+    """Per-document duration, summed if a document is processed more than once."""
+    with _lock:
+        _documents[document] = _documents.get(document, 0.0) + seconds
+
+
+def _add_time(name, seconds, calls=1):
+    with _lock:
+        stats = _timers.setdefault(name, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0})
+        stats["calls"] += calls
+        stats["seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+
+@contextmanager
+def timer(name):
+    """
+    Times a stage. The stage named by PIPELINE_PROFILE_STAGE also runs under
+    cProfile, dumped to PIPELINE_PROFILE_DIR (default: the working directory)
+    as <stage>-<pid>-<n>.prof for snakeviz or pstats.
+    """
+    profiler = None
+    if os.environ.get("PIPELINE_PROFILE_STAGE") == name:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _add_time(name, time.perf_counter() - start)
+        if profiler is not None:
+            profiler.disable()
+            _dump_profile(profiler, name)
+
+
+def _dump_profile(profiler, name):
+    global _profile_runs
+    _profile_runs += 1
+    profile_dir = os.environ.get("PIPELINE_PROFILE_DIR", ".")
+    os.makedirs(profile_dir, exist_ok=True)
+    path = os.path.join(profile_dir, f"{name}-{os.getpid()}-{_profile_runs}.prof")
+    profiler.dump_stats(path)
+    print(f"Profile of stage {name} written to {path}")
+
+
+def snapshot():
+    """All metrics of this process as a JSON-serializable dict."""
+    with _lock:
+        observations = {name: dict(stats, mean=stats["total"] / stats["count"]) for name, stats in _observations.items()}
+        return {
+            "timers": {name: dict(stats) for name, stats in _timers.items()},
+            "counters": dict(_counters),
+            "observations": observations,
+            "documents": dict(_documents),
+        }
+
+
+def merge(other):
+    """Adds a snapshot() from another process to this registry."""
+    with _lock:
+        for name, stats in other["timers"].items():
+            _add_time(name, 0.0, stats["calls"])
+            _timers[name]["seconds"] += stats["seconds"]
+            _timers[name]["max_seconds"] = max(_timers[name]["max_seconds"], stats["max_seconds"])
+        for name, value in other["counters"].items():
+            count(name, value)
+        for name, stats in other["observations"].items():
+            mine = _observations.setdefault(name, {"count": 0, "total": 0, "min": stats["min"], "max": stats["max"]})
+            mine["count"] += stats["count"]
+            mine["total"] += stats["total"]
+            mine["min"] = min(mine["min"], stats["min"])
+            mine["max"] = max(mine["max"], stats["max"])
+        for document, seconds in other["documents"].items():
+            record_document(document, seconds)
+
+
+def sidecar_path(output_json_path):
+    """challenge1b_output.json -> challenge1b_metrics.json in the same directory."""
+    directory, name = os.path.split(os.path.abspath(output_json_path))
+    name = name.replace("output", "metrics") if "output" in name else os.path.splitext(name)[0] + "_metrics.json"
+    return os.path.join(directory, name)
+
+
+def write_sidecar(output_json_path):
+    """Writes this process's metrics next to an output file; returns the metrics path."""
+    path = sidecar_path(output_json_path)
+    with open(path, "w") as f:
+        json.dump(snapshot(), f, indent=2)
+    return path
@@ -0,0 +1,130 @@
+"""
+Multi-query mode: scores one document set against many persona + job queries
+in one pass, extracting and embedding every PDF once.
+
+Usage: python -m core.multi_query INPUT_JSON [INPUT_JSON ...]
+       python -m core.multi_query --collections ROOT
+
+Each input JSON follows challenge1b_input.json, with documents under PDFs/
+next to it, and gets its own output JSON ("input" -> "output" in the name).
+Documents shared by several inputs (same name and content) are parsed and
+embedded once, and all queries are scored in a single matrix multiply.
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+from typing import List
+
+import numpy as np
+
+from . import metrics
+from .schemas import Corpus
+from .generate_output import rank_sections
+from .pipeline import parse_documents
+from .section_cache import file_hash
+
+
+def _document_key(pdf_path):
+    """Identity of a document across inputs: its name and content."""
+    content = file_hash(pdf_path) if os.path.exists(pdf_path) else pdf_path
+    return os.path.basename(pdf_path), content
+
+
+def process_trip_planning_inputs(inputs: List[dict], num_parse_workers=None) -> List[dict]:
+    """
+    core.format.process_trip_planning_input for N inputs at once, returning one
+    output per input in order. Document filenames are full paths, as for
+    process_trip_planning_input. The lexical prefilter and hierarchical scoring
+    pick candidates per query, so this mode always scores every sentence.
+    """
+    from .embedder import embed_sentences, score_corpus_queries
+    metadata = [{
+        "input_documents": [doc["filename"] for doc in input_data["documents"]],
+        "persona": input_data["persona"]["role"],
+        "job_to_be_done": input_data["job_to_be_done"]["task"],
+        "processing_timestamp": datetime.now().isoformat()
+    } for input_data in inputs]
+    queries = [meta["persona"] + " " + meta["job_to_be_done"] for meta in metadata]
+    document_keys = [[_document_key(doc["filename"]) for doc in input_data["documents"]] for input_data in inputs]
+    # Every distinct document once, in first-seen order
+    paths = {}
+    for input_data, keys in zip(inputs, document_keys):
+        for doc, key in zip(input_data["documents"], keys):
+            paths.setdefault(key, doc["filename"])
+    print(f"Multi-query: {len(queries)} queries over {len(paths)} distinct documents")
+
+    metrics.count("queries", len(queries))
+    metrics.count("documents", len(paths))
+    with metrics.timer("collection"):
+        corpora = dict(zip(paths, parse_documents(list(paths.values()), num_parse_workers)))
+        library = Corpus.concat(corpora.values())
+        # Sentence range of each document within the library
+        ranges = {}
+        start = 0
+        for key, corpus in corpora.items():
+            ranges[key] = (start, start + corpus.num_sentences)
+            start += corpus.num_sentences
+
+        scores, stats = score_corpus_queries(library, embed_sentences(queries))
+        print(stats.describe())
+
+        outputs = []
+        for j, (meta, keys) in enumerate(zip(metadata, document_keys)):
+            corpus = Corpus.concat(corpora[key] for key in keys)
+            corpus.scores = np.concatenate([scores[ranges[key][0]:ranges[key][1], j] for key in keys]) \
+                if keys else np.zeros(0, dtype=np.float32)
+            extracted_sections, subsection_analysis = rank_sections(corpus)
+            outputs.append({
+                "metadata": meta,
+                "extracted_sections": [sec.model_dump() for sec in extracted_sections],
+                "subsection_analysis": [sub.model_dump() for sub in subsection_analysis]
+            })
+    return outputs
+
+
+def _output_path(input_json_path):
+    directory, name = os.path.split(input_json_path)
+    output_name = name.replace("input", "output")
+    if output_name == name:
+        output_name = os.path.splitext(name)[0] + "_output.json"
+    return os.path.join(directory, output_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("inputs", nargs="*", help="Input JSON files")
+    parser.add_argument("--collections", help="Run challenge1b_input.json of every Collection* directory under ROOT")
+    args = parser.parse_args()
+
+    input_paths = list(args.inputs)
+    if args.collections:
+        for name in sorted(os.listdir(args.collections)):
+            path = os.path.join(args.collections, name, "challenge1b_input.json")
+            if name.startswith("Collection") and os.path.exists(path):
+                input_paths.append(path)
+    if not input_paths:
+        parser.error("no input JSON files")
+
+    start = datetime.now()
+    inputs = []
+    for path in input_paths:
+        with open(path) as f:
+            input_data = json.load(f)
+        pdf_dir = os.path.join(os.path.dirname(os.path.abspath(path)), "PDFs")
+        for doc in input_data["documents"]:
+            doc["filename"] = os.path.join(pdf_dir, doc["filename"])
+        inputs.append(input_data)
+
+    for path, result in zip(input_paths, process_trip_planning_inputs(inputs)):
+        output_path = _output_path(path)
+        with open(output_path, "w") as f:
+            json.dump(result, f, indent=2)
+        # The sidecar covers the whole pass, which produced every output
+        metrics.write_sidecar(output_path)
+        print(f"Wrote {output_path}")
+    print(f"Processing completed in {datetime.now() - start} seconds")
+
+
+if __name__ == "__main__":
+    main()
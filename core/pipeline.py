@@ -0,0 +1,130 @@
+from multiprocessing import cpu_count
+
+from .sectioner_pymupdf import extract_sections_from_pdf
+from .sentences import add_sections
+from .schemas import Corpus, CorpusBuilder
+from .dedup import DedupStats
+from . import metrics
+from .lexical import prefilter_corpus, prefilter_top_n
+from .hierarchical import coarse_candidates, hierarchical_top_k
+from .executors import executor_kind, in_pool_worker, make_executor
+
+# Sentences collected from parsed documents before the embedding stage runs them as one batch
+EMBED_BATCH_SENTENCES = 2048
+
+
+def parse_document(task):
+    """
+    Parse stage: PyMuPDF extraction, cleaning and sentence splitting for one document.
+    Runs in lightweight pool workers that never import the embedding model, and
+    returns a columnar Corpus, which is far cheaper to pickle than model objects.
+    ProcessExecutor workers also return their metrics for this document, or None in-process.
+    """
+    index, pdf_path = task
+    worker = in_pool_worker()
+    if worker:
+        metrics.reset()
+    builder = CorpusBuilder()
+    try:
+        print(f"Parsing {pdf_path}...")
+        add_sections(builder, extract_sections_from_pdf(pdf_path))
+    except Exception as e:
+        print(f"Error processing {pdf_path}: {e}")
+        builder = CorpusBuilder()
+    return index, builder.build(), metrics.snapshot() if worker else None
+
+
+def parse_documents(pdf_paths, num_parse_workers=None, executor=None):
+    """
+    Parse stage alone: the Corpus of each PDF, in input order, parsed by the
+    given executor kind (PIPELINE_EXECUTOR, default process); num_parse_workers=0
+    parses in this thread.
+    """
+    tasks = list(enumerate(pdf_paths))
+    if num_parse_workers is None:
+        num_parse_workers = min(cpu_count(), len(tasks))
+    with make_executor(executor or executor_kind("process"), num_parse_workers if tasks else 0) as parse_executor:
+        parsed = parse_executor.map(parse_document, tasks)
+    for _, _, worker_metrics in parsed:
+        if worker_metrics is not None:
+            metrics.merge(worker_metrics)
+    return [corpus for _, corpus, _ in parsed]
+
+
+def run_pipeline(pdf_paths, persona_job, num_parse_workers=None,
+                 batch_sentences=EMBED_BATCH_SENTENCES, executor=None) -> Corpus:
+    """
+    Parses documents in parse workers (executor kind: PIPELINE_EXECUTOR, default
+    process) and embeds their sentences in this process, which owns the only
+    copy of the model; thread workers share it. Parsed documents are drained
+    as they complete and embedded in batches of at least batch_sentences, so the
+    embedder works while later documents are still being parsed.
+    Returns the scored Corpus of all documents in input order.
+    num_parse_workers=0 parses in this process.
+    With the lexical prefilter or hierarchical scoring on, candidates are chosen
+    over the whole collection, so embedding waits until every document is parsed.
+    """
+    top_n = prefilter_top_n()
+    top_k = hierarchical_top_k()
+    select_candidates = top_n is not None or top_k is not None
+    if num_parse_workers is None:
+        num_parse_workers = min(cpu_count(), len(pdf_paths))
+    tasks = list(enumerate(pdf_paths))
+    parse_executor = make_executor(executor or executor_kind("process"), num_parse_workers if tasks else 0)
+    try:
+        # Parsing starts before the model loads. Process workers were forked when the
+        # executor was created, before the model is imported, so they stay lightweight
+        parsed = parse_executor.imap_unordered(parse_document, tasks)
+        from .embedder import get_embedding
+        persona_job_emb = get_embedding(persona_job)
+
+        scored = {}
+        stats = DedupStats(0, 0, 0, 0)
+        pending = []
+        pending_sentences = 0
+        for index, corpus, worker_metrics in parsed:
+            if worker_metrics is not None:
+                metrics.merge(worker_metrics)
+            pending.append((index, corpus))
+            pending_sentences += corpus.num_sentences
+            if not select_candidates and pending_sentences >= batch_sentences:
+                stats += _flush(pending, persona_job_emb, scored)
+                pending_sentences = 0
+        if select_candidates:
+            return _score_candidates(pending, tasks, persona_job, persona_job_emb, top_n, top_k)
+        stats += _flush(pending, persona_job_emb, scored)
+    finally:
+        parse_executor.close()
+
+    print(stats.describe())
+
+    return Corpus.concat(scored[index] for index, _ in tasks)
+
+
+def _flush(pending, persona_job_emb, scored):
+    """Embedding stage: scores all pending documents in one batch and hands each its slice of scores."""
+    from .embedder import score_corpus
+    if not pending:
+        return DedupStats(0, 0, 0, 0)
+    batch = Corpus.concat(corpus for _, corpus in pending)
+    stats = score_corpus(batch, persona_job_emb)
+    start = 0
+    for index, corpus in pending:
+        corpus.scores = batch.scores[start:start + corpus.num_sentences]
+        start += corpus.num_sentences
+        scored[index] = corpus
+    pending.clear()
+    return stats
+
+
+def _score_candidates(pending, tasks, persona_job, persona_job_emb, top_n, top_k):
+    """
+    Narrows all parsed documents to the top_n sections by BM25, then to the
+    top_k by section embedding, and scores the sentences of those only.
+    """
+    from .embedder import score_corpus
+    parsed = dict(pending)
+    corpus = prefilter_corpus(Corpus.concat(parsed[index] for index, _ in tasks), persona_job, top_n)
+    corpus = coarse_candidates(corpus, persona_job_emb, top_k)
+    print(score_corpus(corpus, persona_job_emb).describe())
+    return corpus
@@ -2,6 +2,8 @@ import os
 import glob
 import json
 from . import format
+from . import metrics
+from .incremental import prepare_collection, finish_collection
 from datetime import datetime
 
 # Root directory containing collections
@@ -16,6 +18,8 @@ def process_collection(collection_path):
     if not os.path.exists(input_json_path):
         print(f"Input JSON not found: {input_json_path}")
         return
+    # One process may run several collections; each metrics sidecar covers one
+    metrics.reset()
     with open(input_json_path, 'r') as f:
         input_data = json.load(f)
     
@@ -24,12 +28,19 @@ def process_collection(collection_path):
     for doc in input_data["documents"]:
         doc['filename'] = os.path.join(pdf_dir, doc['filename'])
     
-    result = format.process_trip_planning_input(input_data)
+    skip, document_store = prepare_collection(collection_path, input_json_path, input_data, output_json_path)
+    if skip:
+        print(f"Skipping unchanged collection {collection_path}")
+        return
+
+    result = format.process_trip_planning_input(input_data, document_store=document_store)
     with open(output_json_path, 'w') as f:
         json.dump(result, f, indent=2)
+    metrics.write_sidecar(output_json_path)
+    finish_collection(collection_path, document_store)
 
-def main():
-    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+def main(root_dir=None):
+    root_dir = root_dir or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     collections = get_collection_dirs(root_dir)
     for collection in collections:
         collection_path = os.path.join(root_dir, collection)
@@ -2,8 +2,13 @@ import os
 import glob
 import json
 from . import format
+from . import metrics
+from .incremental import prepare_collection, finish_collection
 from datetime import datetime
-from multiprocessing import Pool, cpu_count
+from multiprocessing import Pool, get_context
+from .embedder import get_backend_name, preload_for_fork
+from .resources import (plan_resources, apply_thread_limits, shared_model_enabled, memory_usage,
+                        SHARED_MODEL_MEMORY_BYTES, SHARED_MODEL_WORKER_MEMORY_BYTES)
 
 # Root directory containing collections
 def get_collection_dirs(root_dir):
@@ -17,6 +22,8 @@ def process_collection(collection_path):
     if not os.path.exists(input_json_path):
         print(f"Input JSON not found: {input_json_path}")
         return
+    # One process may run several collections; each metrics sidecar covers one
+    metrics.reset()
     with open(input_json_path, 'r') as f:
         input_data = json.load(f)
     
@@ -25,12 +32,23 @@ def process_collection(collection_path):
     for doc in input_data["documents"]:
         doc['filename'] = os.path.join(pdf_dir, doc['filename'])
     
-    result = format.process_trip_planning_input(input_data)
+    skip, document_store = prepare_collection(collection_path, input_json_path, input_data, output_json_path)
+    if skip:
+        print(f"Skipping unchanged collection {collection_path}")
+        return
+
+    result = format.process_trip_planning_input(input_data, document_store=document_store)
     with open(output_json_path, 'w') as f:
         json.dump(result, f, indent=2)
+    usage = memory_usage()
+    if usage:
+        for name, value in usage.items():
+            metrics.observe(f"memory_{name}_bytes", value)
+    metrics.write_sidecar(output_json_path)
+    finish_collection(collection_path, document_store)
 
-def main():
-    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+def main(root_dir=None):
+    root_dir = root_dir or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     collections = get_collection_dirs(root_dir)
     
     if not collections:
@@ -41,23 +59,60 @@ def main():
     collection_paths = [os.path.join(root_dir, collection) for collection in collections]
     
     print(f"Found {len(collections)} collections to process.")
-    print(f"Using {min(len(collections), cpu_count())} processes.")
+    # Pick process and per-process thread counts together so they don't oversubscribe the cores.
+    # Workers forked after the model is preloaded share its weights, so each costs less memory
+    shared = shared_model_enabled() and get_backend_name() == "torch"
+    if shared:
+        plan = plan_resources(len(collections), worker_memory=SHARED_MODEL_WORKER_MEMORY_BYTES,
+                              shared_memory=SHARED_MODEL_MEMORY_BYTES)
+    else:
+        plan = plan_resources(len(collections))
+    print(plan.describe())
     
+    if plan.processes == 1:
+        # A single worker runs here instead of in a daemonic pool process,
+        # so large PDFs can still be extracted in parallel page shards (PIPELINE_PAGE_SHARDS)
+        apply_thread_limits(plan.threads_per_process)
+        for collection_path in collection_paths:
+            process_collection_with_logging(collection_path)
+        print('All collections processed.')
+        return
+
     # Use multiprocessing to process collections in parallel
-    with Pool(processes=min(len(collections), cpu_count())) as pool:
+    context = None
+    if shared:
+        preload_for_fork()
+        context = get_context("fork")
+    pool_class = context.Pool if context else Pool
+    with pool_class(processes=plan.processes, initializer=apply_thread_limits,
+                    initargs=(plan.threads_per_process,)) as pool:
         # Map the process_collection function to all collection paths
-        pool.map(process_collection_with_logging, collection_paths)
-    
+        usage = pool.map(process_collection_with_logging, collection_paths)
+
+    print(describe_worker_memory(usage, shared))
     print('All collections processed.')
 
+def describe_worker_memory(results, shared):
+    """Summarizes the last memory_usage() reported by each worker process."""
+    workers = {pid: usage for pid, usage in results if usage}
+    if not workers:
+        return "Worker memory: unavailable"
+    mib = 1024 * 1024
+    rss = sum(usage["rss"] for usage in workers.values()) / len(workers) / mib
+    pss = sum(usage["pss"] for usage in workers.values()) / mib
+    private = sum(usage["private"] for usage in workers.values()) / len(workers) / mib
+    return (f"Worker memory ({'shared' if shared else 'per-worker'} model): {len(workers)} workers, "
+            f"{rss:.0f} MiB RSS and {private:.0f} MiB private each, {pss:.0f} MiB PSS in total")
+
 def process_collection_with_logging(collection_path):
-    """Wrapper function to add logging for multiprocessing"""
+    """Wrapper function to add logging for multiprocessing; returns (pid, memory_usage())"""
     print(f'Processing {collection_path}...')
     try:
         process_collection(collection_path)
         print(f'Completed {collection_path}')
     except Exception as e:
         print(f'Error processing {collection_path}: {str(e)}')
+    return os.getpid(), memory_usage()
 
 if __name__ == '__main__':
     start = datetime.now()
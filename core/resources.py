@@ -0,0 +1,154 @@
+import math
+import os
+import sys
+from typing import NamedTuple, Optional
+
+# Resident memory of one worker that loads torch and MiniLM
+MODEL_WORKER_MEMORY_BYTES = 600 * 1024 * 1024
+# Model weights and torch state shared copy-on-write by workers forked after preloading
+SHARED_MODEL_MEMORY_BYTES = 350 * 1024 * 1024
+# Private memory of one such worker: activations, tokenizer buffers and parsed documents
+SHARED_MODEL_WORKER_MEMORY_BYTES = 250 * 1024 * 1024
+# Resident memory of one PyMuPDF parse worker
+PARSE_WORKER_MEMORY_BYTES = 150 * 1024 * 1024
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+class ResourcePlan(NamedTuple):
+    processes: int
+    threads_per_process: int
+    cpus: int
+    memory_bytes: Optional[int]
+    tasks: int
+
+    def describe(self):
+        memory = f"{self.memory_bytes / 2 ** 30:.1f} GiB" if self.memory_bytes else "unlimited"
+        threads = self.threads_per_process or "default"
+        return (f"Resource plan: {self.processes} processes x {threads} threads "
+                f"({self.cpus} CPUs, {memory} memory, {self.tasks} tasks)")
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """CPU quota in cores from cgroup v2 cpu.max or v1 cfs quota, or None if unlimited."""
+    cpu_max = _read("/sys/fs/cgroup/cpu.max")
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+    quota = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+    period = _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def cgroup_memory_limit() -> Optional[int]:
+    """Memory limit in bytes from cgroup v2 memory.max or v1 limit_in_bytes, or None if unlimited."""
+    limit = _read("/sys/fs/cgroup/memory.max") or _read("/sys/fs/cgroup/memory/memory.limit_in_bytes")
+    if not limit or limit == "max":
+        return None
+    limit = int(limit)
+    # cgroup v1 reports "unlimited" as a huge page-aligned number
+    return None if limit >= 1 << 60 else limit
+
+
+def available_cpus() -> int:
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = cgroup_cpu_limit()
+    if quota:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+def available_memory() -> Optional[int]:
+    limits = [cgroup_memory_limit()]
+    try:
+        limits.append(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES"))
+    except (AttributeError, ValueError, OSError):
+        pass
+    limits = [limit for limit in limits if limit]
+    return min(limits) if limits else None
+
+
+def plan_resources(tasks, worker_memory=MODEL_WORKER_MEMORY_BYTES, shared_memory=0,
+                   model_processes=None) -> ResourcePlan:
+    """
+    Chooses worker processes and per-process torch/BLAS threads together, so that
+    processes x threads matches the available cores instead of oversubscribing them.
+    Processes are capped by the task count and by how many workers fit in memory,
+    counting shared_memory (such as preloaded model weights) once for all of them.
+    Threads split the cores between model_processes (default: every worker), the
+    processes that run the model. PIPELINE_PROCESSES (at least 1) and
+    PIPELINE_THREADS override the computed values; unset or "auto" keeps them
+    (PIPELINE_THREADS=0 leaves library defaults untouched).
+    """
+    cpus = available_cpus()
+    memory = available_memory()
+    processes = max(1, min(tasks, cpus))
+    if memory:
+        processes = max(1, min(processes, (memory - shared_memory) // worker_memory))
+    override = os.environ.get("PIPELINE_PROCESSES", "auto")
+    if override != "auto":
+        processes = max(1, int(override))
+    threads = os.environ.get("PIPELINE_THREADS", "auto")
+    threads = max(1, cpus // (model_processes or processes)) if threads == "auto" else int(threads)
+    return ResourcePlan(processes, threads, cpus, memory, tasks)
+
+
+def shared_model_enabled() -> bool:
+    """
+    Whether collection workers share one preloaded model: on by default where
+    workers can be forked, PIPELINE_SHARED_MODEL=0 turns it off.
+    """
+    import multiprocessing
+    return (os.environ.get("PIPELINE_SHARED_MODEL", "1") != "0"
+            and "fork" in multiprocessing.get_all_start_methods())
+
+
+def memory_usage(pid="self") -> Optional[dict]:
+    """
+    RSS, PSS, shared and private bytes of a process from /proc/<pid>/smaps_rollup,
+    or None where it is unavailable. PSS divides each shared page between the
+    processes mapping it, so summing PSS over workers counts shared weights once.
+    """
+    rollup = _read(f"/proc/{pid}/smaps_rollup")
+    if rollup is None:
+        return None
+    fields = {}
+    for line in rollup.splitlines()[1:]:
+        name, _, value = line.partition(":")
+        if value.strip().endswith("kB"):
+            fields[name] = int(value.split()[0]) * 1024
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def apply_thread_limits(threads):
+    """
+    Caps intra-op threads for torch, ONNX Runtime and BLAS in this process.
+    Environment variables cover libraries imported later; torch is also
+    reconfigured if it is already loaded. threads=0 keeps library defaults.
+    """
+    if not threads:
+        return
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
@@ -1,4 +1,6 @@
+from array import array
 from typing import List
+import numpy as np
 from pydantic import BaseModel, Field
 
 
@@ -45,3 +47,251 @@ class SubsectionAnalysis(BaseModel):
     refined_text: str
     page_number: int
 
+
+
+# Columnar corpus: struct-of-arrays replacement for per-sentence models.
+# Pydantic models above are only built at the JSON output boundary.
+#
+# Per sentence the corpus holds a 4-byte string id, a 4-byte score and, once
+# embedded, a 4 * hidden_size byte embedding row (1,536 bytes for MiniLM), plus
+# the interned string itself (~120 bytes each, stored once however often it occurs).
+# A SentenceSimilarity model costs ~540 bytes per sentence before its string, and
+# AverageSimilaritySection adds ~110 more (measured with tracemalloc, 40k sentences).
+# At ~40 sentences per page, 1,000 pages (~40k sentences) need ~5 MB for strings
+# and ids/scores, plus ~61 MB while embeddings are held, instead of ~26 MB of
+# model objects before embeddings.
+
+
+class SentenceView:
+    """Read-only view of one sentence of a Corpus."""
+    __slots__ = ("corpus", "index")
+
+    def __init__(self, corpus, index):
+        self.corpus = corpus
+        self.index = index
+
+    @property
+    def sentence(self) -> str:
+        return self.corpus.strings[self.corpus.sentence_ids[self.index]]
+
+    @property
+    def cosine_similarity(self) -> float:
+        return float(self.corpus.scores[self.index])
+
+
+class SectionView:
+    """Read-only view of one section of a Corpus."""
+    __slots__ = ("corpus", "index")
+
+    def __init__(self, corpus, index):
+        self.corpus = corpus
+        self.index = index
+
+    @property
+    def document(self) -> str:
+        return self.corpus.strings[self.corpus.section_document_ids[self.index]]
+
+    @property
+    def section_title(self) -> str:
+        return self.corpus.strings[self.corpus.section_title_ids[self.index]]
+
+    @property
+    def page_number(self) -> int:
+        return int(self.corpus.section_pages[self.index])
+
+    @property
+    def sentence_range(self):
+        return range(int(self.corpus.section_offsets[self.index]), int(self.corpus.section_offsets[self.index + 1]))
+
+    @property
+    def section_content(self) -> List[SentenceView]:
+        return [SentenceView(self.corpus, i) for i in self.sentence_range]
+
+    @property
+    def sentences(self) -> List[str]:
+        return [self.corpus.strings[i] for i in self.corpus.sentence_ids[self.sentence_range.start:self.sentence_range.stop]]
+
+
+class Corpus:
+    """
+    Struct-of-arrays representation of sentenced sections across documents.
+    strings is an interned table shared by sentences, titles and document names.
+    Sentence i is strings[sentence_ids[i]] with score scores[i]; section j spans
+    sentences section_offsets[j]:section_offsets[j + 1]; document k spans
+    sections document_offsets[k]:document_offsets[k + 1].
+    """
+    __slots__ = ("strings", "sentence_ids", "scores", "embeddings", "section_offsets",
+                 "section_title_ids", "section_document_ids", "section_pages", "document_offsets")
+
+    def __init__(self, strings, sentence_ids, section_offsets, section_title_ids,
+                 section_document_ids, section_pages, document_offsets, scores=None, embeddings=None):
+        self.strings = strings
+        self.sentence_ids = np.asarray(sentence_ids, dtype=np.int32)
+        self.section_offsets = np.asarray(section_offsets, dtype=np.int64)
+        self.section_title_ids = np.asarray(section_title_ids, dtype=np.int32)
+        self.section_document_ids = np.asarray(section_document_ids, dtype=np.int32)
+        self.section_pages = np.asarray(section_pages, dtype=np.int32)
+        self.document_offsets = np.asarray(document_offsets, dtype=np.int64)
+        self.scores = np.zeros(len(self.sentence_ids), dtype=np.float32) if scores is None else np.asarray(scores, dtype=np.float32)
+        self.embeddings = embeddings
+
+    @property
+    def num_sentences(self) -> int:
+        return len(self.sentence_ids)
+
+    @property
+    def num_sections(self) -> int:
+        return len(self.section_title_ids)
+
+    @property
+    def num_documents(self) -> int:
+        return len(self.document_offsets) - 1
+
+    def section(self, index) -> SectionView:
+        return SectionView(self, index)
+
+    def sections(self):
+        return (SectionView(self, i) for i in range(self.num_sections))
+
+    def sentence_texts(self) -> List[str]:
+        return [self.strings[i] for i in self.sentence_ids]
+
+    def to_arrays(self) -> dict:
+        """
+        Plain NumPy arrays for np.savez (no pickling): the string table becomes one
+        UTF-8 buffer with offsets. Embeddings are not included.
+        """
+        encoded = [text.encode("utf-8") for text in self.strings]
+        string_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(data) for data in encoded], out=string_offsets[1:])
+        return {
+            "string_data": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "string_offsets": string_offsets,
+            "sentence_ids": self.sentence_ids,
+            "section_offsets": self.section_offsets,
+            "section_title_ids": self.section_title_ids,
+            "section_document_ids": self.section_document_ids,
+            "section_pages": self.section_pages,
+            "document_offsets": self.document_offsets,
+            "scores": self.scores,
+        }
+
+    @staticmethod
+    def from_arrays(arrays) -> "Corpus":
+        """Inverse of to_arrays; arrays may be a loaded .npz file."""
+        data = arrays["string_data"].tobytes()
+        offsets = arrays["string_offsets"]
+        strings = [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+        return Corpus(
+            strings,
+            arrays["sentence_ids"],
+            arrays["section_offsets"],
+            arrays["section_title_ids"],
+            arrays["section_document_ids"],
+            arrays["section_pages"],
+            arrays["document_offsets"],
+            scores=arrays["scores"]
+        )
+
+    def select_sections(self, indices) -> "Corpus":
+        """Corpus of the given sections in the given order, sharing this string table. Scores and embeddings are carried over."""
+        indices = np.asarray(indices, dtype=np.int64)
+        starts = self.section_offsets[indices]
+        lengths = self.section_offsets[indices + 1] - starts
+        ends = np.cumsum(lengths)
+        sentence_index = np.repeat(starts - (ends - lengths), lengths) + np.arange(ends[-1] if len(ends) else 0)
+        documents = self.section_document_ids[indices]
+        # A new document starts whenever the document changes, as in CorpusBuilder
+        changes = np.flatnonzero(documents[1:] != documents[:-1]) + 1
+        document_offsets = np.concatenate(([0], changes, [len(indices)])) if len(indices) else np.zeros(1, dtype=np.int64)
+        return Corpus(
+            self.strings,
+            self.sentence_ids[sentence_index],
+            np.concatenate(([0], ends)),
+            self.section_title_ids[indices],
+            documents,
+            self.section_pages[indices],
+            document_offsets,
+            scores=self.scores[sentence_index],
+            embeddings=None if self.embeddings is None else self.embeddings[sentence_index]
+        )
+
+    @staticmethod
+    def concat(corpora) -> "Corpus":
+        """Concatenates corpora, merging their string tables. Scores and embeddings are carried over."""
+        corpora = list(corpora)
+        builder = CorpusBuilder()
+        sentence_ids, titles, documents = [], [], []
+        section_offsets, document_offsets = [np.zeros(1, dtype=np.int64)], [np.zeros(1, dtype=np.int64)]
+        num_sentences = num_sections = 0
+        for corpus in corpora:
+            remap = np.array([builder.intern(text) for text in corpus.strings], dtype=np.int32)
+            sentence_ids.append(remap[corpus.sentence_ids])
+            titles.append(remap[corpus.section_title_ids])
+            documents.append(remap[corpus.section_document_ids])
+            section_offsets.append(corpus.section_offsets[1:] + num_sentences)
+            document_offsets.append(corpus.document_offsets[1:] + num_sections)
+            num_sentences += corpus.num_sentences
+            num_sections += corpus.num_sections
+        embeddings = None
+        if corpora and all(corpus.embeddings is not None for corpus in corpora):
+            embeddings = np.concatenate([corpus.embeddings for corpus in corpora])
+        return Corpus(
+            builder.strings,
+            np.concatenate(sentence_ids) if sentence_ids else [],
+            np.concatenate(section_offsets),
+            np.concatenate(titles) if titles else [],
+            np.concatenate(documents) if documents else [],
+            np.concatenate([corpus.section_pages for corpus in corpora]) if corpora else [],
+            np.concatenate(document_offsets),
+            scores=np.concatenate([corpus.scores for corpus in corpora]) if corpora else None,
+            embeddings=embeddings
+        )
+
+
+class CorpusBuilder:
+    """Accumulates sections into growable arrays and produces an immutable Corpus."""
+    __slots__ = ("strings", "_string_ids", "_sentence_ids", "_section_offsets", "_section_title_ids",
+                 "_section_document_ids", "_section_pages", "_document_offsets")
+
+    def __init__(self):
+        self.strings = []
+        self._string_ids = {}
+        self._sentence_ids = array("i")
+        self._section_offsets = array("q", [0])
+        self._section_title_ids = array("i")
+        self._section_document_ids = array("i")
+        self._section_pages = array("i")
+        self._document_offsets = array("q", [0])
+
+    def intern(self, text: str) -> int:
+        string_id = self._string_ids.get(text)
+        if string_id is None:
+            string_id = self._string_ids[text] = len(self.strings)
+            self.strings.append(text)
+        return string_id
+
+    def add_section(self, document: str, section_title: str, page_number: int, sentences: List[str]):
+        document_id = self.intern(document)
+        # A new document starts whenever the document name changes
+        if self._section_document_ids and self._section_document_ids[-1] != document_id:
+            self._document_offsets.append(len(self._section_title_ids))
+        self._section_document_ids.append(document_id)
+        self._section_title_ids.append(self.intern(section_title))
+        self._section_pages.append(page_number)
+        self._sentence_ids.extend(self.intern(sentence) for sentence in sentences)
+        self._section_offsets.append(len(self._sentence_ids))
+
+    def build(self) -> Corpus:
+        document_offsets = array("q", self._document_offsets)
+        if self._section_title_ids:
+            document_offsets.append(len(self._section_title_ids))
+        return Corpus(
+            list(self.strings),
+            np.frombuffer(self._sentence_ids, dtype=np.int32).copy(),
+            np.frombuffer(self._section_offsets, dtype=np.int64).copy(),
+            np.frombuffer(self._section_title_ids, dtype=np.int32).copy(),
+            np.frombuffer(self._section_document_ids, dtype=np.int32).copy(),
+            np.frombuffer(self._section_pages, dtype=np.int32).copy(),
+            np.frombuffer(document_offsets, dtype=np.int64).copy()
+        )
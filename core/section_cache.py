@@ -0,0 +1,117 @@
+import hashlib
+import os
+import struct
+import threading
+from typing import List, Optional
+
+from .schemas import Section
+
+# File layout: magic, section count, then per section the page number and
+# length-prefixed UTF-8 title and content
+MAGIC = b"SEC1"
+_HEADER = struct.Struct("<4sI")
+_SECTION = struct.Struct("<III")
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a file's content, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dump_sections(sections: List[Section]) -> bytes:
+    parts = [_HEADER.pack(MAGIC, len(sections))]
+    for section in sections:
+        title = section.section_title.encode("utf-8")
+        content = section.section_content.encode("utf-8")
+        parts.append(_SECTION.pack(section.page_number, len(title), len(content)))
+        parts.append(title)
+        parts.append(content)
+    return b"".join(parts)
+
+
+def load_sections(data: bytes, document: str) -> List[Section]:
+    """Decodes dump_sections output. The document name is not stored, since identical PDFs may be named differently."""
+    magic, count = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a section cache file")
+    offset = _HEADER.size
+    sections = []
+    for _ in range(count):
+        page, title_len, content_len = _SECTION.unpack_from(data, offset)
+        offset += _SECTION.size
+        title = data[offset:offset + title_len].decode("utf-8")
+        offset += title_len
+        content = data[offset:offset + content_len].decode("utf-8")
+        offset += content_len
+        sections.append(Section(
+            document=document,
+            section_title=title,
+            section_content=content,
+            page_number=page
+        ))
+    return sections
+
+
+class SectionCache:
+    """
+    Stores extracted sections per PDF, keyed by the PDF content hash and the
+    extractor version, so unchanged files never reach PyMuPDF again.
+    """
+
+    def __init__(self, cache_dir, extractor_version):
+        self.cache_dir = cache_dir
+        self.extractor_version = extractor_version
+        self.hits = 0
+        self.misses = 0
+        # Parse threads share one cache; its files are written atomically, only the stats need a lock
+        self._stats_lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key_for(self, pdf_path):
+        return f"{file_hash(pdf_path)}-v{self.extractor_version}"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".bin")
+
+    def load(self, key, document) -> Optional[List[Section]]:
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            sections = load_sections(data, document)
+        except (OSError, ValueError, struct.error, UnicodeDecodeError):
+            with self._stats_lock:
+                self.misses += 1
+            return None
+        with self._stats_lock:
+            self.hits += 1
+        return sections
+
+    def store(self, key, sections: List[Section]):
+        # Write to a temporary file and rename so concurrent readers never see partial data
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(dump_sections(sections))
+        os.replace(tmp_path, path)
+
+    def summary(self):
+        return f"Section cache: {self.hits} hits, {self.misses} misses"
+
+
+_section_cache = None
+_section_cache_lock = threading.Lock()
+
+
+def get_section_cache(extractor_version):
+    """Returns the shared SectionCache, or None when PIPELINE_CACHE_DIR is not set."""
+    global _section_cache
+    cache_root = os.environ.get("PIPELINE_CACHE_DIR")
+    if _section_cache is None and cache_root:
+        with _section_cache_lock:
+            if _section_cache is None:
+                _section_cache = SectionCache(os.path.join(cache_root, "sections"), extractor_version)
+    return _section_cache
@@ -1,78 +1,167 @@
-import fitz  # PyMuPDF
 import os
 import re
+import time
+import threading
+import multiprocessing
+from core import metrics
 from core.schemas import Section
+from core.section_cache import get_section_cache
+from core.resources import available_cpus
 from typing import List
 
+# Bump whenever extraction or cleaning output changes, so cached sections are invalidated
+EXTRACTOR_VERSION = "1"
+
+# PyMuPDF is not thread-safe; threaded callers (the resident server, PIPELINE_EXECUTOR=thread)
+# take turns, so threads never extract two PDFs at once
+_fitz_lock = threading.Lock()
+
+# PDFs with at least this many pages are extracted in page ranges by parallel workers
+PAGE_SHARD_MIN_PAGES = 32
+# Fewest pages worth handing to one shard worker
+PAGES_PER_SHARD_MIN = 8
+
+
+# Character-level mappings of clean_text, applied in one str.translate pass
+_CHAR_MAP = {
+    # Unicode ligatures
+    0xFB00: 'ff', 0xFB01: 'fi', 0xFB02: 'fl', 0xFB03: 'ffi', 0xFB04: 'ffl', 0xFB05: 'ft', 0xFB06: 'st',
+    # Smart quotes, dashes and ellipsis
+    0x2018: "'", 0x2019: "'", 0x201C: '"', 0x201D: '"', 0x2013: '-', 0x2014: '-', 0x2026: '...',
+    # Bullet points and zero-width characters are removed
+    0x2022: None, 0x2023: None, 0x25E6: None, 0x2043: None, 0x2219: None,
+    0x200B: None, 0x200C: None, 0x200D: None, 0xFEFF: None,
+    # Non-breaking space to regular space
+    0x00A0: ' ',
+}
+# Control characters are removed
+_CHAR_MAP.update({code: None for code in range(0x00, 0x20)})
+_CHAR_MAP.update({code: None for code in range(0x7F, 0xA0)})
+
+# Literal "\u2022"-style escape sequences left in the text
+_LITERAL_ESCAPE_RE = re.compile(r'\\u[0-9a-fA-F]{4}')
+# Standalone "o " left over from bullet formatting
+_BULLET_O_RE = re.compile(r'\bo\s+')
+# Bullet "o" at the start of a raw content line
+_LEADING_O_RE = re.compile(r'^o\s+')
+# "office" and "offline" split where a ligature was lost
+_OCR_FIX_RE = re.compile(r'(?P<office>\boffi\s*ce\b)|\boff\s*line\b')
+
+
+def _ocr_fix(match):
+    return 'office' if match.group('office') else 'offline'
+
 
 def clean_text(text):
     """Clean text by removing unwanted Unicode characters and normalizing whitespace."""
     if not text:
         return ""
-    
-    # First, handle Unicode ligatures and special combinations
-    text = re.sub(r'\ufb00', 'ff', text)  # ff ligature
-    text = re.sub(r'\ufb01', 'fi', text)  # fi ligature
-    text = re.sub(r'\ufb02', 'fl', text)  # fl ligature
-    text = re.sub(r'\ufb03', 'ffi', text)  # ffi ligature
-    text = re.sub(r'\ufb04', 'ffl', text)  # ffl ligature
-    text = re.sub(r'\ufb05', 'ft', text)   # ft ligature
-    text = re.sub(r'\ufb06', 'st', text)   # st ligature
-    
-    # Handle Unicode escape sequences that should be converted to proper characters
-    # Common smart quotes and apostrophes
-    text = re.sub(r'[\u2018\u2019]', "'", text)  # Smart single quotes to regular apostrophe
-    text = re.sub(r'[\u201C\u201D]', '"', text)  # Smart double quotes to regular quotes
-    text = re.sub(r'[\u2013\u2014]', '-', text)  # En dash and em dash to regular dash
-    text = re.sub(r'[\u2026]', '...', text)  # Ellipsis to three dots
-    
-    # Remove common Unicode bullet points and special characters
-    text = re.sub(r'[\u2022\u2023\u25E6\u2043\u2219]', '', text)  # Various bullet points
-    text = re.sub(r'[\u200B\u200C\u200D\uFEFF]', '', text)  # Zero-width characters
-    text = re.sub(r'[\u00A0]', ' ', text)  # Non-breaking space to regular space
-    
-    # Remove other problematic Unicode characters that might appear as \u sequences
-    text = re.sub(r'[\u0000-\u001F\u007F-\u009F]', '', text)  # Control characters
-    
-    # Handle any remaining Unicode escape sequences that might be literal \u codes in the text
-    # This catches cases where the text contains literal "\u2022" strings instead of the actual character
-    text = re.sub(r'\\u[0-9a-fA-F]{4}', '', text)
-    
-    # Clean up any "o " patterns that might be leftover bullet formatting
-    text = re.sub(r'\bo\s+', '', text)  # Remove standalone "o " (often from bullet points)
-    
-    # Handle common OCR/PDF extraction errors
-    text = re.sub(r'o\ufb04ine', 'offline', text)  # Specific fix for "offline"
-    text = re.sub(r'o\ufb03ce', 'office', text)    # Specific fix for "office"
-    
-    # Normalize whitespace
-    text = re.sub(r'\s+', ' ', text)
-    text = text.strip()
-    
-    return text
-
-
-def extract_lines_with_fonts(pdf_path):
-    doc = fitz.open(pdf_path)
-    lines = []
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        blocks = page.get_text("dict")['blocks']
-        for b in blocks:
-            if b['type'] == 0:
-                for l in b['lines']:
-                    line_text = " ".join([span['text'] for span in l['spans']]).strip()
-                    cleaned_text = clean_text(line_text)
-                    if cleaned_text:  # Only include lines with meaningful content after cleaning
-                        font_names = list(set(span['font'] for span in l['spans']))
-                        font_size = max(span['size'] for span in l['spans'])
-                        lines.append({
-                            "text": cleaned_text,
-                            "font_names": font_names,
-                            "font_size": font_size,
-                            "page": page_num
-                        })
-    return lines
+    text = text.translate(_CHAR_MAP)
+    if '\\u' in text:
+        text = _LITERAL_ESCAPE_RE.sub('', text)
+    text = _BULLET_O_RE.sub('', text)
+    return ' '.join(text.split())
+
+
+def _renormalize(text):
+    """
+    clean_text for text that has already been cleaned. Cleaning is idempotent
+    unless removing a literal escape joined the pieces of another one, so only
+    such text goes through the engine again.
+    """
+    return clean_text(text) if '\\u' in text else text
+
+
+def iter_lines(pdf_path, page_range=None):
+    """
+    Yields cleaned text lines with font information page by page, for all pages
+    or the (start, stop) page_range. Only the current page is held in memory.
+    """
+    import fitz  # PyMuPDF, imported here so cached runs never load it
+    with _fitz_lock:
+        doc = fitz.open(pdf_path)
+    try:
+        start, stop = page_range or (0, len(doc))
+        for page_num in range(start, stop):
+            metrics.count("pages_parsed")
+            with _fitz_lock:
+                blocks = doc[page_num].get_text("dict")['blocks']
+            for b in blocks:
+                if b['type'] == 0:
+                    for l in b['lines']:
+                        line_text = " ".join([span['text'] for span in l['spans']]).strip()
+                        cleaned_text = clean_text(line_text)
+                        if cleaned_text:  # Only include lines with meaningful content after cleaning
+                            font_names = list(set(span['font'] for span in l['spans']))
+                            font_size = max(span['size'] for span in l['spans'])
+                            yield {
+                                "text": cleaned_text,
+                                "font_names": font_names,
+                                "font_size": font_size,
+                                "page": page_num
+                            }
+    finally:
+        with _fitz_lock:
+            doc.close()
+
+
+def extract_lines_with_fonts(pdf_path, page_range=None):
+    """Cleaned text lines with font information, for all pages or the (start, stop) page_range."""
+    return list(iter_lines(pdf_path, page_range))
+
+
+def page_shards(num_pages, workers):
+    """Splits num_pages into at most workers contiguous (start, stop) page ranges."""
+    if num_pages < PAGE_SHARD_MIN_PAGES:
+        workers = 1
+    shards = max(1, min(workers, num_pages // PAGES_PER_SHARD_MIN))
+    bounds = [num_pages * i // shards for i in range(shards + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def page_shard_workers():
+    """
+    Shard workers for one PDF. Sharding is opt-in: 1 (serial) unless
+    PIPELINE_PAGE_SHARDS is set to a worker count or "auto" (every available
+    core), since each sharded PDF forks a pool, possibly from a process that
+    already holds the model. Pool workers are daemonic processes, which cannot
+    start children, so they extract serially; their pool already spreads
+    documents over the cores. So do parse threads: the documents are spread
+    over them, and forking next to other running threads is unsafe.
+    """
+    if multiprocessing.current_process().daemon or threading.current_thread() is not threading.main_thread():
+        return 1
+    shards = os.environ.get("PIPELINE_PAGE_SHARDS", "1")
+    return available_cpus() if shards == "auto" else max(1, int(shards))
+
+
+def _extract_shard(task):
+    pdf_path, page_range = task
+    return extract_lines_with_fonts(pdf_path, page_range)
+
+
+def extract_lines_sharded(pdf_path, workers=None):
+    """
+    extract_lines_with_fonts split into page ranges that separate processes
+    extract, each opening its own document. Lines are concatenated in page
+    order, so the result is identical to a serial run.
+    """
+    workers = page_shard_workers() if workers is None else workers
+    if workers < 2:
+        # Serial extraction opens the document once, without counting its pages first
+        return extract_lines_with_fonts(pdf_path)
+    import fitz
+    with _fitz_lock, fitz.open(pdf_path) as doc:
+        num_pages = len(doc)
+    shards = page_shards(num_pages, workers)
+    if len(shards) < 2:
+        return extract_lines_with_fonts(pdf_path)
+    with multiprocessing.Pool(processes=len(shards)) as pool:
+        parts = pool.map(_extract_shard, [(pdf_path, shard) for shard in shards])
+    # Shard workers count pages in their own metrics registry, which is discarded
+    metrics.count("pages_parsed", num_pages)
+    metrics.count("page_shards", len(shards))
+    return [line for part in parts for line in part]
 
 def is_heading(line):
     """
@@ -141,89 +230,113 @@ def post_process_section_content(content):
     """
     if not content:
         return ""
-    
-    # Split into lines for processing
-    lines = content.split('\n')
+    return _join_section(clean_text(_LEADING_O_RE.sub('', line.strip())) for line in content.split('\n'))
+
+
+def _finalize_section(lines):
+    """
+    post_process_section_content for lines that extraction has already cleaned,
+    without splitting, stripping and cleaning them again.
+    """
+    return _join_section(_renormalize(line) for line in lines)
+
+
+def _join_section(lines):
+    """
+    OCR fixes and the line filter over cleaned lines. clean_text removes the
+    newline separators of the joined content, so lines are joined directly.
+    """
     processed_lines = []
-    
     for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Additional cleaning for common patterns
-        # Remove standalone "o" at the beginning of lines (bullet artifacts)
-        line = re.sub(r'^o\s+', '', line)
-        
-        # Clean up any remaining escape sequences
-        line = clean_text(line)
-        
-        # Additional specific fixes for common OCR errors
-        line = re.sub(r'\boffi\s*ce\b', 'office', line)  # office split across ligatures
-        line = re.sub(r'\boff\s*line\b', 'offline', line)  # offline split
-        
-        # Fix common word boundary issues
-        line = re.sub(r'\s+', ' ', line)  # Multiple spaces to single space
-        
-        # Only keep lines that have meaningful content
+        line = _OCR_FIX_RE.sub(_ocr_fix, line)
         if should_include_line(line):
             processed_lines.append(line)
-    
-    # Final pass to clean up the entire content
-    result = '\n'.join(processed_lines).strip()
-    
-    # Apply final cleaning to the entire content
-    result = clean_text(result)
-    
-    return result
+    return _renormalize(''.join(processed_lines))
 
 
 def extract_sections_from_pdf(pdf_path):
+    """
+    Returns the sections of a PDF, served from the section cache when the file
+    content and extractor version are unchanged.
+    """
     doc_name = os.path.basename(pdf_path)
-    lines = extract_lines_with_fonts(pdf_path)
-    sections = []
+    start = time.perf_counter()
+    try:
+        cache = get_section_cache(EXTRACTOR_VERSION)
+        if cache is None:
+            return parse_sections_from_pdf(pdf_path)
+        key = cache.key_for(pdf_path)
+        sections = cache.load(key, doc_name)
+        metrics.count("section_cache_misses" if sections is None else "section_cache_hits")
+        if sections is None:
+            sections = parse_sections_from_pdf(pdf_path)
+            cache.store(key, sections)
+        return sections
+    finally:
+        metrics.record_document(doc_name, time.perf_counter() - start)
+
+
+def parse_sections_from_pdf(pdf_path, workers=None):
+    """Extracts and sections a PDF without the cache; large PDFs are extracted in page shards."""
+    with metrics.timer("extraction"):
+        lines = extract_lines_sharded(pdf_path, workers)
+    metrics.count("lines_extracted", len(lines))
+    with metrics.timer("sectioning"):
+        sections = sections_from_lines(lines, os.path.basename(pdf_path))
+    metrics.count("sections", len(sections))
+    return sections
+
+
+def sections_from_lines(lines, doc_name):
+    """
+    Groups extracted lines into sections under their headings. Sections may
+    span shard boundaries, so this always runs over the stitched line list.
+    """
+    return list(iter_sections(lines, doc_name))
+
+
+def iter_sections(lines, doc_name):
+    """
+    Yields each section as soon as the next heading (or the end of lines)
+    closes it, so lines can be any iterable, such as iter_lines.
+    """
     current_section = None
     current_content = []
     current_page = 0
     for line in lines:
         if is_heading(line):
             if current_section:
-                # Filter and clean content before creating section
-                filtered_content = [content for content in current_content 
-                                  if should_include_line(content)]
-                if filtered_content:  # Only create section if there's meaningful content
-                    section_content = post_process_section_content('\n'.join(filtered_content))
-                    if section_content:  # Double-check after post-processing
-                        section_obj = Section(
-                            document=doc_name,
-                            section_title=current_section,
-                            section_content=section_content,
-                            page_number=current_page
-                        )
-                        sections.append(section_obj)
+                section_obj = _build_section(doc_name, current_section, current_content, current_page)
+                if section_obj:
+                    yield section_obj
                 current_content = []
-            current_section = clean_text(line["text"].strip())
+            current_section = _renormalize(line["text"])
             current_page = line["page"]
         else:
             # Add line to content if it passes the filtering
             if should_include_line(line["text"]):
                 current_content.append(line["text"])
-    
+
     if current_section:
-        # Filter and clean content before creating final section
-        filtered_content = [content for content in current_content 
-                          if should_include_line(content)]
-        if filtered_content:  # Only create section if there's meaningful content
-            section_content = post_process_section_content('\n'.join(filtered_content))
-            if section_content:  # Double-check after post-processing
-                section_obj = Section(
-                    document=doc_name,
-                    section_title=current_section,
-                    section_content=section_content,
-                    page_number=current_page
-                )
-                sections.append(section_obj)
-    return sections
+        section_obj = _build_section(doc_name, current_section, current_content, current_page)
+        if section_obj:
+            yield section_obj
+
+
+def _build_section(doc_name, section_title, content, page_number):
+    # Filter and clean content before creating section
+    filtered_content = [line for line in content if should_include_line(line)]
+    if not filtered_content:  # Only create section if there's meaningful content
+        return None
+    section_content = _finalize_section(filtered_content)
+    if not section_content:  # Double-check after post-processing
+        return None
+    return Section(
+        document=doc_name,
+        section_title=section_title,
+        section_content=section_content,
+        page_number=page_number
+    )
 
 def extract_all_sections(data_dir) -> List[Section]:
     """
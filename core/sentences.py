@@ -0,0 +1,29 @@
+from typing import List
+from .schemas import Section, SentencedSection, CorpusBuilder
+
+
+def split_sentences(text: str) -> List[str]:
+    # Split by fullstop, then strip and filter out empty sentences
+    return [s.strip() for s in text.split(".") if s.strip()]
+
+
+def add_sections(builder: CorpusBuilder, sections: List[Section]):
+    # Splits each section into sentences and appends it to the columnar corpus
+    for section in sections:
+        builder.add_section(section.document, section.section_title, section.page_number,
+                            split_sentences(section.section_content))
+
+
+def convert_to_sentences(sections: List[Section])-> List[SentencedSection]:
+    # Converts each section's content into a list of sentences
+    sections_in_sentences = []
+    for section in sections:
+        sentences = split_sentences(section.section_content)
+        section_obj = SentencedSection(
+            document=section.document,
+            section_title=section.section_title,
+            section_content=sentences,
+            page_number=section.page_number
+        )
+        sections_in_sentences.append(section_obj)
+    return sections_in_sentences
@@ -0,0 +1,191 @@
+"""
+Resident pipeline server: keeps the tokenizer and model loaded and serves
+process_trip_planning_input over HTTP on a TCP port or a Unix socket.
+
+Usage: python -m core.server [--host 127.0.0.1] [--port 8080 | --unix-socket PATH] [--window-ms 5]
+
+POST /process takes the challenge1b_input.json schema and returns the output
+JSON. Document filenames are paths readable by the server, or names under
+<collection>/PDFs when the request is POST /process?collection=<dir>.
+GET /health reports readiness.
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from urllib.parse import parse_qs, urlparse
+
+from . import format, metrics
+
+# How long the batching thread waits for more requests after the first one arrives
+DEFAULT_WINDOW_MS = 5
+# Sentences that close a shared batch early
+MAX_BATCH_SENTENCES = 4096
+
+
+class MicroBatcher:
+    """
+    Merges embed_sentences calls from concurrent requests into shared batches.
+    The first call opens a window of window_seconds; calls arriving within it
+    (up to max_sentences) are embedded together, each distinct text once, and
+    every caller gets its own rows back. Only the batching thread runs the model.
+    """
+
+    def __init__(self, window_seconds=DEFAULT_WINDOW_MS / 1000, max_sentences=MAX_BATCH_SENTENCES):
+        self.window_seconds = window_seconds
+        self.max_sentences = max_sentences
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def is_worker(self):
+        return threading.current_thread() is self._thread
+
+    def embed(self, sentences, token_budget, use_cache, backend):
+        future = Future()
+        self._queue.put(((token_budget, use_cache, backend), list(sentences), future))
+        return future.result()
+
+    def _collect(self, first):
+        batch = [first]
+        num_sentences = len(first[1])
+        deadline = time.monotonic() + self.window_seconds
+        while num_sentences < self.max_sentences:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+            num_sentences += len(item[1])
+        return batch
+
+    def _run(self):
+        from .embedder import embed_sentences
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            groups = {}
+            for item in self._collect(first):
+                groups.setdefault(item[0], []).append(item)
+            for (token_budget, use_cache, backend), items in groups.items():
+                index = {}
+                rows = [[index.setdefault(text, len(index)) for text in sentences] for _, sentences, _ in items]
+                try:
+                    embeddings = embed_sentences(list(index), token_budget, use_cache, backend)
+                except Exception as e:
+                    for _, _, future in items:
+                        future.set_exception(e)
+                    continue
+                metrics.observe("micro_batch_requests", len(items))
+                metrics.observe("micro_batch_sentences", len(index))
+                for (_, _, future), request_rows in zip(items, rows):
+                    future.set_result(embeddings[request_rows])
+
+
+class PipelineRequestHandler(BaseHTTPRequestHandler):
+    def _send_json(self, status, body):
+        data = json.dumps(body, indent=2).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "unix-socket"
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/process":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        try:
+            input_data = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            collection = parse_qs(url.query).get("collection", [None])[0]
+            if collection:
+                pdf_dir = os.path.join(collection, "PDFs")
+                for doc in input_data["documents"]:
+                    doc["filename"] = os.path.join(pdf_dir, doc["filename"])
+            result = format.process_trip_planning_input(input_data)
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": f"Invalid input: {e}"})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, result)
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(host="127.0.0.1", port=8080, unix_socket=None):
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        return ThreadingUnixHTTPServer(unix_socket, PipelineRequestHandler)
+    return ThreadingHTTPServer((host, port), PipelineRequestHandler)
+
+
+def serve(host="127.0.0.1", port=8080, unix_socket=None, window_ms=DEFAULT_WINDOW_MS):
+    # Page-shard pools would fork from a threaded process that holds the model
+    os.environ.setdefault("PIPELINE_PAGE_SHARDS", "1")
+    from .embedder import get_embedding, set_micro_batcher
+    start = time.perf_counter()
+    get_embedding("warm up")
+    print(f"Model loaded in {time.perf_counter() - start:.2f}s")
+    batcher = MicroBatcher(window_ms / 1000).start()
+    set_micro_batcher(batcher)
+    server = make_server(host, port, unix_socket)
+    print(f"Serving on {unix_socket or f'http://{host}:{server.server_address[1]}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        set_micro_batcher(None)
+        batcher.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix-socket", help="Listen on this Unix socket path instead of TCP")
+    parser.add_argument("--window-ms", type=float, default=DEFAULT_WINDOW_MS,
+                        help="Latency window for merging concurrent embedding work")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.unix_socket, args.window_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import os
+
+from .sectioner_pymupdf import iter_lines, iter_sections
+from .sentences import split_sentences
+from .schemas import CorpusBuilder
+from .generate_output import TopSectionAccumulator
+from .dedup import DedupStats
+from .pipeline import EMBED_BATCH_SENTENCES
+
+
+def iter_document_sections(pdf_paths):
+    """
+    Sections of each PDF in order, read page by page. The section cache is not
+    used, since it stores whole documents. A document that fails partway keeps
+    the sections already yielded.
+    """
+    for pdf_path in pdf_paths:
+        try:
+            yield from iter_sections(iter_lines(pdf_path), os.path.basename(pdf_path))
+        except Exception as e:
+            print(f"Error processing {pdf_path}: {e}")
+
+
+def iter_sentence_batches(sections, batch_sentences=EMBED_BATCH_SENTENCES):
+    """Groups sections into Corpus batches of at least batch_sentences sentences; sections are never split."""
+    builder = CorpusBuilder()
+    num_sections = 0
+    num_sentences = 0
+    for section in sections:
+        sentences = split_sentences(section.section_content)
+        builder.add_section(section.document, section.section_title, section.page_number, sentences)
+        num_sections += 1
+        num_sentences += len(sentences)
+        if num_sentences >= batch_sentences:
+            yield builder.build()
+            builder = CorpusBuilder()
+            num_sections = 0
+            num_sentences = 0
+    if num_sections:
+        yield builder.build()
+
+
+def run_streaming(pdf_paths, persona_job, top_sections=5, top_sentences=5,
+                  batch_sentences=EMBED_BATCH_SENTENCES):
+    """
+    Streaming mode: pages -> lines -> sections -> sentence batches -> scores ->
+    bounded top-k. Each batch is scored and dropped before the next is read, so
+    peak memory depends on the batch size and the largest section, not on the
+    number of pages. Returns (extracted_sections, subsection_analysis) like
+    rank_sections. Duplicate sentences are only collapsed within a batch.
+    """
+    from .embedder import get_embedding, score_corpus
+    persona_job_emb = get_embedding(persona_job)
+    top = TopSectionAccumulator(top_sections, top_sentences)
+    stats = DedupStats(0, 0, 0, 0)
+    for batch in iter_sentence_batches(iter_document_sections(pdf_paths), batch_sentences):
+        stats += score_corpus(batch, persona_job_emb)
+        top.add(batch)
+    print(stats.describe())
+    return top.result()
@@ -0,0 +1,79 @@
+"""
+Golden-output test for the single-pass text normalizer: clean_text,
+post_process_section_content and sectioning must match the regex cascade they
+replaced (benchmarks.normalizer keeps it as the reference) on edge cases, fuzzed
+strings and, where present, the sample collections.
+
+Usage: python -m pytest core/test_sectioner_pymupdf.py
+"""
+import glob
+import os
+import random
+
+from benchmarks.normalizer import (legacy_clean_text, legacy_post_process_section_content, legacy_sections,
+                                   new_sections, raw_lines)
+from core import sectioner_pymupdf
+from core.sectioner_pymupdf import clean_text, post_process_section_content
+
+# Edge cases the sample PDFs may not contain: ligatures, escapes split by
+# removed characters, bullets, control characters and the OCR fixes
+EDGE_CASES = [
+    "o\ufb03ce o\ufb04ine \ufb01nal \ufb00 \ufb02 \ufb05 \ufb06",
+    "\u2022 Bullet \u2023 item \u25e6 and \u2043 more \u2219 done",
+    "\u201cQuoted\u201d \u2018text\u2019 \u2013 dash \u2014 and\u2026",
+    "zero\u200bwidth\u200c\u200d\ufeff joins\u00a0nbsp",
+    "control\x00\x01\x1f\x7f\x85\x9f chars\tand\nnewlines\r",
+    "literal \\u2022 escape \\u20\u200b22 split \\u\\u20221234 nested",
+    "trailing backslash \\", "u2022 continues",
+    "o bullet o o start", "xo o y", "a-o o b", "o\tx", " o  leading", "o",
+    "offi ce offi  ce office off line offline offlinexx xoff line",
+    "The offi\ufb01ce of\ufb00 line",
+    "   ", "", "ab", "12.", "- ab", "* item text here", "\u2003em\u2003space\u3000ideographic",
+]
+
+
+def _fuzz_strings(count, seed=0):
+    rng = random.Random(seed)
+    alphabet = ["o", " ", "o ", "\\u", "2022", "\\u2022", "\\", "u", "ff", "offi", "ce", "off", "line",
+                "\ufb01", "\ufb03", "\ufb04", "\u2022", "\u200b", "\u00a0", "\t", "\n", "\x00", "\x85",
+                "\u2019", "\u2026", "-", "x", "Word", "a.", "12", "\u3000"]
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 16))) for _ in range(count)]
+
+
+GOLDEN_STRINGS = EDGE_CASES + _fuzz_strings(20000)
+
+
+def _sample_pdfs():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return sorted(glob.glob(os.path.join(root, "Collection*", "PDFs", "*.pdf")))
+
+
+def test_clean_text_matches_legacy():
+    mismatches = [text for text in GOLDEN_STRINGS if clean_text(text) != legacy_clean_text(text)]
+    assert not mismatches, f"{len(mismatches)} mismatches, first {mismatches[0]!r}"
+
+
+def test_post_process_section_content_matches_legacy():
+    mismatches = [text for text in GOLDEN_STRINGS
+                  if post_process_section_content(text) != legacy_post_process_section_content(text)]
+    assert not mismatches, f"{len(mismatches)} mismatches, first {mismatches[0]!r}"
+
+
+def test_sections_match_legacy():
+    # Synthetic documents mixing bold headings and body lines drawn from the golden strings
+    rng = random.Random(1)
+    for i in range(200):
+        lines = [{"text": text, "font_names": [rng.choice(["Arial", "Arial-Bold"])], "font_size": 10, "page": 0}
+                 for text in rng.sample(GOLDEN_STRINGS, 12)]
+        assert new_sections(lines) == legacy_sections(lines), f"synthetic document {i}"
+
+
+def test_sample_collections_match_legacy():
+    # The wired-up extractor, not just the normalizer, must match the reference
+    for pdf in _sample_pdfs():
+        lines = raw_lines(pdf)
+        for line in lines:
+            assert clean_text(line["text"]) == legacy_clean_text(line["text"]), pdf
+        parsed = [(s.section_title, s.section_content, s.page_number)
+                  for s in sectioner_pymupdf.parse_sections_from_pdf(pdf)]
+        assert parsed == legacy_sections(lines), pdf
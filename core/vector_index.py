@@ -0,0 +1,259 @@
+"""
+Persistent vector index over a fixed PDF library: sentence embeddings and the
+columnar corpus are stored once, so each persona + job query only embeds the
+query string and searches the index.
+
+Usage: python -m core.vector_index build PDF_DIR INDEX_DIR [--nlist N]
+       python -m core.vector_index query INDEX_DIR INPUT_JSON [--output PATH] [--nprobe N]
+
+Without --output the result JSON is the only thing written to stdout.
+
+Exact search scores every sentence with one matrix-vector product and produces
+the same extracted_sections/subsection_analysis as core.format. With --nlist,
+build also clusters the embeddings into an IVF (inverted file) index, and
+query --nprobe N scores only the sections with a sentence in the N lists
+closest to the query, for libraries too large to scan.
+"""
+import argparse
+import contextlib
+import glob
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+from . import metrics
+from .schemas import Corpus
+from .dedup import deduplicate
+from .generate_output import rank_sections
+from .incremental import PIPELINE_VERSION
+from .pipeline import parse_documents
+from .section_cache import file_hash
+from .sectioner_pymupdf import EXTRACTOR_VERSION
+
+INDEX_META = "index.json"
+INDEX_CORPUS = "corpus.npz"
+# One row per distinct sentence; "occurrences" maps each corpus sentence to its row
+INDEX_EMBEDDINGS = "embeddings.npy"
+INDEX_IVF = "ivf.npz"
+# Rows sampled to train the IVF centroids, and k-means iterations
+IVF_TRAIN_ROWS = 100000
+IVF_ITERATIONS = 10
+
+
+def index_version():
+    """
+    Pipeline, extractor and model versions plus the near-duplicate threshold, hashed:
+    only what changes the stored sentences and vectors. Query-time settings such as
+    LEXICAL_PREFILTER_TOP_N do not invalidate an index.
+    """
+    from .embedder import get_backend_name, model_id
+    parts = [PIPELINE_VERSION, EXTRACTOR_VERSION, model_id(get_backend_name()),
+             f"NEAR_DUPLICATE_THRESHOLD={os.environ.get('NEAR_DUPLICATE_THRESHOLD', '')}"]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def _save_npy(path, array):
+    tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def train_ivf(embeddings, nlist, seed=0):
+    """
+    Spherical k-means over L2-normalized rows. Returns (centroids, list_offsets,
+    list_rows): the rows of list c are list_rows[list_offsets[c]:list_offsets[c + 1]].
+    """
+    rng = np.random.default_rng(seed)
+    nlist = min(nlist, len(embeddings))
+    sample = embeddings[rng.choice(len(embeddings), min(len(embeddings), IVF_TRAIN_ROWS), replace=False)]
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(IVF_ITERATIONS):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = sample[assignment == c]
+            if len(members):
+                centroid = members.sum(axis=0)
+                centroids[c] = centroid / max(np.linalg.norm(centroid), 1e-12)
+    assignment = np.argmax(embeddings @ centroids.T, axis=1)
+    list_rows = np.argsort(assignment, kind="stable")
+    list_offsets = np.zeros(nlist + 1, dtype=np.int64)
+    np.cumsum(np.bincount(assignment, minlength=nlist), out=list_offsets[1:])
+    return centroids.astype(np.float32), list_offsets, list_rows
+
+
+def build_index(pdf_paths, index_dir, nlist=None, num_parse_workers=None):
+    """
+    Parses every PDF, embeds each distinct sentence once and writes the corpus,
+    embeddings and metadata (plus IVF lists with nlist) to index_dir.
+    """
+    from .embedder import embed_sentences, near_duplicate_threshold
+    os.makedirs(index_dir, exist_ok=True)
+    with metrics.timer("index_build"):
+        corpus = Corpus.concat(parse_documents(pdf_paths, num_parse_workers))
+
+        # Same deduplication as score_corpus, across the whole library
+        unique_ids, inverse = np.unique(corpus.sentence_ids, return_inverse=True)
+        dedup = deduplicate([corpus.strings[i] for i in unique_ids], near_duplicate_threshold())
+        embeddings = embed_sentences(dedup.unique_texts)
+        arrays = corpus.to_arrays()
+        arrays["occurrences"] = dedup.inverse[inverse]
+
+        corpus_path = os.path.join(index_dir, INDEX_CORPUS)
+        np.savez(f"{corpus_path}.{os.getpid()}.tmp.npz", **arrays)
+        os.replace(f"{corpus_path}.{os.getpid()}.tmp.npz", corpus_path)
+        _save_npy(os.path.join(index_dir, INDEX_EMBEDDINGS), embeddings)
+        ivf_path = os.path.join(index_dir, INDEX_IVF)
+        if nlist and len(embeddings):
+            centroids, list_offsets, list_rows = train_ivf(embeddings, nlist)
+            np.savez(f"{ivf_path}.{os.getpid()}.tmp.npz", centroids=centroids,
+                     list_offsets=list_offsets, list_rows=list_rows)
+            os.replace(f"{ivf_path}.{os.getpid()}.tmp.npz", ivf_path)
+        elif os.path.exists(ivf_path):
+            os.remove(ivf_path)
+
+    meta = {
+        "index_version": index_version(),
+        "documents": {os.path.basename(path): file_hash(path) for path in pdf_paths},
+        "sentences": corpus.num_sentences,
+        "embeddings": len(embeddings),
+        "nlist": int(min(nlist, len(embeddings))) if nlist and len(embeddings) else None,
+    }
+    meta_path = os.path.join(index_dir, INDEX_META)
+    with open(f"{meta_path}.{os.getpid()}.tmp", "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(f"{meta_path}.{os.getpid()}.tmp", meta_path)
+    print(f"Indexed {len(pdf_paths)} documents: {corpus.num_sections} sections, "
+          f"{corpus.num_sentences} sentences, {len(embeddings)} embeddings"
+          + (f", {meta['nlist']} IVF lists" if meta["nlist"] else ""))
+    return meta
+
+
+def _section_sentences(section_offsets, sections):
+    """Sentence indices of the given sections, section by section."""
+    starts = section_offsets[sections]
+    lengths = section_offsets[sections + 1] - starts
+    ends = np.cumsum(lengths)
+    return np.repeat(starts - (ends - lengths), lengths) + np.arange(ends[-1] if len(ends) else 0)
+
+
+class VectorIndex:
+    """A built index loaded for querying; embeddings are memory-mapped, not read up front."""
+
+    def __init__(self, index_dir):
+        with open(os.path.join(index_dir, INDEX_META)) as f:
+            self.meta = json.load(f)
+        if self.meta.get("index_version") != index_version():
+            raise ValueError(f"Index {index_dir} was built with other pipeline settings or model; rebuild it")
+        with np.load(os.path.join(index_dir, INDEX_CORPUS), allow_pickle=False) as arrays:
+            self.corpus = Corpus.from_arrays(arrays)
+            self.occurrences = arrays["occurrences"]
+        self.embeddings = np.load(os.path.join(index_dir, INDEX_EMBEDDINGS), mmap_mode="r")
+        self.ivf = None
+        ivf_path = os.path.join(index_dir, INDEX_IVF)
+        if os.path.exists(ivf_path):
+            with np.load(ivf_path, allow_pickle=False) as arrays:
+                self.ivf = {name: arrays[name] for name in arrays.files}
+        # Section index of every sentence, and document name of every section
+        self.sentence_sections = np.repeat(np.arange(self.corpus.num_sections), np.diff(self.corpus.section_offsets))
+        self.section_documents = np.array([self.corpus.strings[i] for i in self.corpus.section_document_ids], dtype=object)
+
+    def candidate_sections(self, persona_job_emb, nprobe) -> np.ndarray:
+        """Sections with at least one sentence in the nprobe IVF lists closest to the query."""
+        centroids, list_offsets, list_rows = self.ivf["centroids"], self.ivf["list_offsets"], self.ivf["list_rows"]
+        probed = np.argsort(-(centroids @ persona_job_emb), kind="stable")[:nprobe]
+        rows = np.concatenate([list_rows[list_offsets[c]:list_offsets[c + 1]] for c in probed])
+        hit = np.zeros(len(self.embeddings), dtype=bool)
+        hit[rows] = True
+        return np.unique(self.sentence_sections[hit[self.occurrences]])
+
+    def search(self, persona_job_emb, documents=None, nprobe: Optional[int] = None,
+               top_sections=5, top_sentences=5):
+        """
+        Ranks the indexed sections for one query embedding, like rank_sections on a
+        freshly scored corpus. documents restricts the search to these document
+        names, ranked in this order; nprobe switches to IVF candidate search.
+        """
+        with metrics.timer("index_search"):
+            if documents is None:
+                sections = np.arange(self.corpus.num_sections)
+            else:
+                by_document = {name: [] for name in documents}
+                for i, name in enumerate(self.section_documents):
+                    if name in by_document:
+                        by_document[name].append(i)
+                sections = np.array([i for name in documents for i in by_document[name]], dtype=np.int64)
+            if nprobe is not None and self.ivf is not None:
+                sections = sections[np.isin(sections, self.candidate_sections(persona_job_emb, nprobe))]
+            sentences = _section_sentences(self.corpus.section_offsets, sections)
+            rows = self.occurrences[sentences]
+            unique_rows, inverse = np.unique(rows, return_inverse=True)
+            corpus = self.corpus.select_sections(sections)
+            corpus.scores = (np.asarray(self.embeddings[unique_rows]) @ persona_job_emb)[inverse].astype(np.float32)
+            metrics.count("sentences_scored", corpus.num_sentences)
+            return rank_sections(corpus, top_sections, top_sentences)
+
+
+def process_trip_planning_input(input_data, index: VectorIndex, nprobe=None):
+    """core.format.process_trip_planning_input answered from a VectorIndex; only the query is embedded."""
+    from .embedder import get_embedding
+    metadata = {
+        "input_documents": [doc["filename"] for doc in input_data["documents"]],
+        "persona": input_data["persona"]["role"],
+        "job_to_be_done": input_data["job_to_be_done"]["task"],
+        "processing_timestamp": datetime.now().isoformat()
+    }
+    persona_job_query = metadata["persona"] + " " + metadata["job_to_be_done"]
+    documents = [os.path.basename(doc["filename"]) for doc in input_data["documents"]]
+    missing = [name for name in documents if name not in index.meta["documents"]]
+    if missing:
+        print(f"Not in the index, skipped: {', '.join(missing)}")
+    with metrics.timer("collection"):
+        extracted_sections, subsection_analysis = index.search(
+            get_embedding(persona_job_query), documents, nprobe)
+    return {
+        "metadata": metadata,
+        "extracted_sections": [sec.model_dump() for sec in extracted_sections],
+        "subsection_analysis": [sub.model_dump() for sub in subsection_analysis]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Index every PDF in a directory")
+    build.add_argument("pdf_dir")
+    build.add_argument("index_dir")
+    build.add_argument("--nlist", type=int, help="Also build an IVF index with this many lists")
+    query = commands.add_parser("query", help="Answer a challenge1b_input.json from an index")
+    query.add_argument("index_dir")
+    query.add_argument("input_json")
+    query.add_argument("--output", help="Output JSON path (default: stdout)")
+    query.add_argument("--nprobe", type=int, help="Search only the N closest IVF lists")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_index(sorted(glob.glob(os.path.join(args.pdf_dir, "*.pdf"))), args.index_dir, args.nlist)
+        return
+    start = datetime.now()
+    # Without --output, stdout carries only the result JSON; progress messages go to stderr
+    with contextlib.redirect_stdout(sys.stdout if args.output else sys.stderr):
+        index = VectorIndex(args.index_dir)
+        with open(args.input_json) as f:
+            input_data = json.load(f)
+        result = process_trip_planning_input(input_data, index, args.nprobe)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(result, f, indent=2)
+            metrics.write_sidecar(args.output)
+        print(f"Query answered in {datetime.now() - start}")
+    if not args.output:
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
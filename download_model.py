@@ -2,7 +2,15 @@
 """
 Script to pre-download and cache the sentence-transformers model during Docker build.
 This ensures the model is available offline during container execution.
+
+The torch backend's load-ready artifact is written as well (EXPORT_TORCHSCRIPT=0 skips it):
+a frozen TorchScript graph of the forward pass, mean pooling and normalization plus the
+serialized fast tokenizer, which the embedder loads without going through transformers.
+
+With EXPORT_ONNX=1 the model is also exported to ONNX for the onnx embedder backend,
+and with QUANTIZE_ONNX=1 an int8 dynamically quantized copy is written as well.
 """
+import json
 import os
 from transformers import AutoTokenizer, AutoModel
 
@@ -10,6 +18,15 @@ from transformers import AutoTokenizer, AutoModel
 cache_dir = "/home/app/.cache"
 os.makedirs(cache_dir, exist_ok=True)
 
+# Must match TORCHSCRIPT_DIR in core/embedder.py
+torchscript_dir = os.path.join(cache_dir, "torchscript", "all-MiniLM-L6-v2")
+export_torchscript = os.environ.get("EXPORT_TORCHSCRIPT", "1") == "1"
+
+# Must match ONNX_DIR in core/embedder.py
+onnx_dir = os.path.join(cache_dir, "onnx", "all-MiniLM-L6-v2")
+export_onnx = os.environ.get("EXPORT_ONNX") == "1"
+quantize_onnx = os.environ.get("QUANTIZE_ONNX") == "1"
+
 print("Downloading sentence-transformers model: all-MiniLM-L6-v2")
 
 # Download tokenizer and model to cache
@@ -26,3 +43,78 @@ print("Model downloaded successfully!")
 print(f"Cache directory: {cache_dir}")
 print(f"Tokenizer: {type(tokenizer)}")
 print(f"Model: {type(model)}")
+
+if export_torchscript:
+    import torch
+    import torch.nn.functional as F
+
+    class SentenceEmbeddings(torch.nn.Module):
+        """Forward pass, mean pooling and L2 normalization, as TorchBackend.encode computes them."""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            token_embeddings = self.model(input_ids=input_ids, attention_mask=attention_mask,
+                                          token_type_ids=token_type_ids)[0]
+            mask = attention_mask.unsqueeze(-1).to(token_embeddings.dtype)
+            emb = (token_embeddings * mask).sum(1) / torch.clamp(mask.sum(1), min=1e-9)
+            return F.normalize(emb, p=2, dim=1)
+
+    os.makedirs(torchscript_dir, exist_ok=True)
+    # Traced on a padded batch, so the graph keeps the attention mask path
+    example = tokenizer(["An example sentence used to trace the model", "Short one"],
+                        padding=True, return_tensors="pt")
+    model.eval()
+    with torch.no_grad():
+        traced = torch.jit.trace(SentenceEmbeddings(model).eval(),
+                                 (example["input_ids"], example["attention_mask"], example["token_type_ids"]))
+    torch.jit.freeze(traced).save(os.path.join(torchscript_dir, "model.pt"))
+    tokenizer.backend_tokenizer.save(os.path.join(torchscript_dir, "tokenizer.json"))
+    with open(os.path.join(torchscript_dir, "artifact.json"), "w") as f:
+        json.dump({
+            "hidden_size": model.config.hidden_size,
+            # What truncation=True truncates to in the transformers tokenizer
+            "max_length": min(tokenizer.model_max_length, model.config.max_position_embeddings),
+            "pad_token_id": tokenizer.pad_token_id,
+        }, f, indent=2)
+    print(f"TorchScript artifact: {torchscript_dir}")
+
+if export_onnx or quantize_onnx:
+    import torch
+
+    class TokenEmbeddings(torch.nn.Module):
+        """Exposes the model with keyword inputs and the token embeddings as the only output."""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids)[0]
+
+    os.makedirs(onnx_dir, exist_ok=True)
+    onnx_path = os.path.join(onnx_dir, "model.onnx")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dummy = tokenizer(["An example sentence used to trace the model"], return_tensors="pt")
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    model.eval()
+    torch.onnx.export(
+        TokenEmbeddings(model),
+        tuple(dummy[name] for name in input_names),
+        onnx_path,
+        input_names=input_names,
+        output_names=["last_hidden_state"],
+        dynamic_axes=dynamic_axes,
+        opset_version=14,
+        dynamo=False
+    )
+    print(f"ONNX model: {onnx_path}")
+
+    if quantize_onnx:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        int8_path = os.path.join(onnx_dir, "model-int8.onnx")
+        quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QInt8)
+        print(f"Quantized ONNX model: {int8_path}")